@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from ..common.cache import get_versions, invalidate
+from .models import User
+
+
+PRINCIPAL_KEY_PREFIX = 'principal'
+VERSION_CLAIM = 'authz_version'
+
+
+def principal_scope(user_id) -> str:
+    return f'{PRINCIPAL_KEY_PREFIX}:{user_id}'
+
+
+def get_principal_version(user_id) -> int:
+    return get_versions([principal_scope(user_id)])[principal_scope(user_id)]
+
+
+def invalidate_principal(*user_ids) -> None:
+    """
+    Make tokens issued before now fall back to the database for authorization.
+    Signals call it for saves and deletes, queryset.update() has to call it itself.
+    """
+    invalidate(*map(principal_scope, user_ids))
+
+
+def load_principal_state(user_id):
+    """Authorization data of a user in one query, None if the user doesn't exist."""
+    row = User.objects.filter(pk=user_id).values('is_active', 'is_staff', 'account_type', 'seller__id',
+                                                  'seller__is_approved').first()
+    if row is None:
+        return None
+    return {
+        'is_active': row['is_active'],
+        'is_staff': row['is_staff'],
+        'account_type': row['account_type'],
+        'seller_id': row['seller__id'],
+        'seller_approved': bool(row['seller__is_approved']),
+    }
+
+
+def principal_claims(user, version=None) -> dict:
+    """
+    Claims added to the tokens of a user, read back by ClaimsJWTAuthentication.
+    `version` has to be read before `user` was loaded, a change committed in
+    between would otherwise be stamped with the version that follows it.
+    """
+    seller = getattr(user, 'seller', None)
+    return {
+        'group': 'admin' if user.is_staff else 'user',
+        'role': user.account_type,
+        'seller_id': str(seller.id) if seller else None,
+        'seller_approved': bool(seller and seller.is_approved),
+        VERSION_CLAIM: get_principal_version(user.id) if version is None else version,
+    }
+
+
+def build_principal(user_id, state) -> User:
+    """
+    request.user of token authenticated requests: a User with only the authorization
+    fields loaded from the token claims or the principal cache. The remaining
+    fields are deferred and load together the first time one of them is read.
+    """
+    values = dict(id=User._meta.pk.to_python(user_id), is_active=state['is_active'], is_staff=state['is_staff'],
+                  account_type=state['account_type'])
+    # from_db() expects the values in the order of the model fields
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    user = User.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+    seller_id = state['seller_id']
+    user.__dict__['seller_id'] = User._meta.pk.to_python(seller_id) if seller_id is not None else None
+    user.__dict__['seller_approved'] = state['seller_approved']
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that doesn't read the user from the database.
+
+    Tokens carry the authorization version of their user. While it is still the
+    current one, the principal is built from the claims. Once account_type,
+    is_active, is_staff or the seller changed, the token falls back to the
+    authorization data of the user, loaded once per version and kept for
+    PRINCIPAL_CACHE_TIMEOUT seconds. Without a stored version (dummy backend,
+    cache outage) nothing tells the claims are current, every request loads the
+    authorization data.
+    """
+    cache_timeout = getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 60 * 5)
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Needs the password hash of the user
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+        version = get_principal_version(user_id)
+        if version is not None and validated_token.get(VERSION_CLAIM) == version:
+            return build_principal(user_id, {
+                'is_active': True,
+                'is_staff': validated_token.get('group') == 'admin',
+                'account_type': validated_token.get('role'),
+                'seller_id': validated_token.get('seller_id'),
+                'seller_approved': bool(validated_token.get('seller_approved')),
+            })
+
+        if version is None:
+            state = load_principal_state(user_id) or {}
+        else:
+            key = f'{principal_scope(user_id)}:{version}'
+            state = cache.get(key)
+            if state is None:
+                state = load_principal_state(user_id) or {}
+                cache.set(key, state, self.cache_timeout)
+        if not state:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not state['is_active']:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return build_principal(user_id, state)
@@ -0,0 +1,134 @@
+import hashlib
+import math
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ..common.cache import cache_is_shared, get_versions, invalidate
+
+
+BLACKLIST_SCOPE = 'token-blacklist'
+
+
+class BloomFilter:
+    """
+    Set membership in a fixed bit array. `in` can return false positives at about
+    `error_rate` once `capacity` items are added, never false negatives.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, item: str):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        changed = False
+        for position in self.positions(item):
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                changed = True
+        # Items added twice are counted once
+        if changed:
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+
+class BlacklistFilter:
+    """
+    Per-process Bloom filter over the JTIs of blacklisted tokens, so checking a
+    token that isn't blacklisted needs no query.
+
+    Every blacklisting bumps the version of BLACKLIST_SCOPE. A check that sees a
+    newer version than the one the filter was loaded at reads the rows blacklisted
+    since then, going back `overlap` for rows whose transaction committed after
+    later ones. The filter is rebuilt from all rows every `resync_interval` and
+    once it grows past its capacity, which also drops pruned tokens.
+    """
+
+    overlap = timedelta(minutes=5)
+    resync_interval = timedelta(hours=1)
+
+    def __init__(self, capacity=None, error_rate=0.001):
+        self.capacity = capacity or getattr(settings, 'TOKEN_BLACKLIST_FILTER_CAPACITY', 100000)
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.loaded_at = None
+        self.last_blacklisted_at = None
+        self.version = None
+
+    def refresh(self) -> None:
+        version = get_versions([BLACKLIST_SCOPE])[BLACKLIST_SCOPE]
+        # Without a cache keeping versions (dummy backend) every check reads the new rows
+        if version is not None and version == self.version:
+            return
+        with self.lock:
+            if version is not None and version == self.version:
+                return
+            now = timezone.now()
+            bloom, last_blacklisted_at = self.bloom, self.last_blacklisted_at
+            if bloom is None or bloom.count > bloom.capacity or self.loaded_at < now - self.resync_interval:
+                # Filled in before it replaces the current one, checks running meanwhile use the old one
+                bloom, last_blacklisted_at = BloomFilter(max(self.capacity, 2 * BlacklistedToken.objects.count()),
+                                                         self.error_rate), None
+                self.loaded_at = now
+            rows = BlacklistedToken.objects.order_by('blacklisted_at').values_list('blacklisted_at', 'token__jti')
+            if last_blacklisted_at is not None:
+                rows = rows.filter(blacklisted_at__gte=last_blacklisted_at - self.overlap)
+            for blacklisted_at, jti in rows.iterator(chunk_size=5000):
+                bloom.add(jti)
+                last_blacklisted_at = blacklisted_at
+            self.bloom, self.last_blacklisted_at, self.version = bloom, last_blacklisted_at, version
+
+    def add(self, jti: str) -> None:
+        if self.bloom is not None:
+            self.bloom.add(jti)
+
+    def might_contain(self, jti: str) -> bool:
+        self.refresh()
+        return jti in self.bloom
+
+
+_filter = BlacklistFilter()
+
+
+def get_blacklist_filter() -> BlacklistFilter:
+    return _filter
+
+
+def is_blacklisted(jti) -> bool:
+    # Only a shared cache shows the versions bumped by blacklistings in other processes
+    if cache_is_shared() and not get_blacklist_filter().might_contain(jti):
+        return False
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+class FilteredRefreshToken(RefreshToken):
+    """RefreshToken checking the blacklist filter before the database."""
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError("Token is blacklisted")
+
+    def blacklist(self):
+        result = super().blacklist()
+        get_blacklist_filter().add(self.payload[api_settings.JTI_CLAIM])
+        invalidate(BLACKLIST_SCOPE)
+        return result
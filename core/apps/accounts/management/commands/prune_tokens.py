@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding tokens and their blacklist entries in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0,
+                            help="Seconds to wait between batches, to spread the load on the database")
+
+    def handle(self, *args, **options):
+        batch_size, now = options['batch_size'], aware_utcnow()
+        outstanding_label, blacklisted_label = OutstandingToken._meta.label, BlacklistedToken._meta.label
+        deleted = {outstanding_label: 0, blacklisted_label: 0}
+        last_id = 0
+        while True:
+            # Expiry follows creation, so walking the primary key finds the expired rows first
+            ids = list(OutstandingToken.objects.filter(pk__gt=last_id, expires_at__lte=now)
+                       .order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            # Blacklist entries go with their tokens by cascade
+            _, counts = OutstandingToken.objects.filter(pk__in=ids).only('pk').delete()
+            for label in deleted:
+                deleted[label] += counts.get(label, 0)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Deleted {len(ids)} tokens up to id {last_id}")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted[outstanding_label]} outstanding and {deleted[blacklisted_label]} blacklisted tokens"))
@@ -0,0 +1,10 @@
+from django.db import migrations
+
+
+# 0003 never made it into the repository while 0004 depends on it, so the graph
+# didn't load and no migration or test could run. This empty one takes its name:
+# 0002 and 0004 make the same account_type change, and databases that applied
+# the lost file keep a consistent history. Don't remove it or renumber 0004.
+class Migration(migrations.Migration):
+    dependencies = [('accounts', '0002_alter_user_account_type')]
+    operations = []
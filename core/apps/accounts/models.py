@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils.functional import cached_property
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 
 from ..common.models import IsDeletedModel
@@ -16,6 +17,8 @@ class User(AbstractBaseUser, IsDeletedModel, PermissionsMixin):
     last_name = models.CharField(max_length=50, null=True, verbose_name='Last name')
     email = models.EmailField(unique=True, verbose_name='Email')
     avatar = models.ImageField(upload_to='avatars/', null=True, default='avatars/default.jpg')
+    # Resized copies of the avatar, see common/images.py
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
 
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
@@ -23,6 +26,7 @@ class User(AbstractBaseUser, IsDeletedModel, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
+    IMAGE_FIELDS = ('avatar',)
 
     objects = CustomUserManager()
 
@@ -30,6 +34,24 @@ class User(AbstractBaseUser, IsDeletedModel, PermissionsMixin):
     def full_name(self):
         return f'{self.first_name} {self.last_name}'
 
+    # Set from token claims on request.user, see accounts/authentication.py
+    @cached_property
+    def seller_id(self):
+        seller = getattr(self, 'seller', None)
+        return seller.id if seller else None
+
+    @cached_property
+    def seller_approved(self):
+        seller = getattr(self, 'seller', None)
+        return bool(seller and seller.is_approved)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Reading one deferred field loads all of them, request.user defers everything but authorization fields
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using, fields, from_queryset)
+
     def __str__(self):
         return self.full_name
 
@@ -1,7 +1,12 @@
 from django.contrib.auth.hashers import make_password
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer, \
+    TokenVerifySerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import UntypedToken
 
+from .authentication import get_principal_version, principal_claims
+from .blacklist import FilteredRefreshToken, is_blacklisted
 from .models import User
 
 
@@ -15,18 +20,45 @@ class CreateUserSerializer(serializers.ModelSerializer):
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = FilteredRefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
 
-        # Adding user information to token's payload
-        if user.is_staff:
-            token['group'] = 'admin'
-        else:
-            token['group'] = 'user'
-            token['role'] = user.account_type
+        # Adding user information to token's payload, enough to authorize requests without the database
+        for claim, value in principal_claims(user).items():
+            token[claim] = value
         return token
 
 
+class RestampedRefreshToken(FilteredRefreshToken):
+    """
+    Refresh token taking the current principal claims of its user once decoded,
+    so the access token and the rotated refresh token made from it don't carry
+    the authorization the user had when logging in.
+    """
+
+    def __init__(self, token=None, verify=True):
+        super().__init__(token, verify)
+        if token is None:
+            return
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        version = get_principal_version(user_id)
+        user = User.objects.select_related('seller').filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is not None:
+            for claim, value in principal_claims(user, version).items():
+                self[claim] = value
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RestampedRefreshToken
 
 
+class CustomTokenVerifySerializer(TokenVerifySerializer):
+    def validate(self, attrs):
+        token = UntypedToken(attrs["token"])
+        # Most tokens are not blacklisted, the filter answers those without a query
+        if api_settings.BLACKLIST_AFTER_ROTATION and is_blacklisted(token.get(api_settings.JTI_CLAIM)):
+            raise serializers.ValidationError("Token is blacklisted")
+        return {}
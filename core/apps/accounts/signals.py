@@ -0,0 +1,52 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from ..sellers.models import Seller
+from .authentication import invalidate_principal
+from .models import User
+
+
+# Fields copied into the tokens of a user, see authentication.principal_claims()
+USER_AUTHORIZATION_FIELDS = ('is_active', 'is_staff', 'account_type')
+SELLER_AUTHORIZATION_FIELDS = ('is_approved',)
+
+
+def remember_fields(model, instance, field_names, update_fields):
+    if instance._state.adding or (update_fields is not None and not set(update_fields) & set(field_names)):
+        instance._old_authorization = None
+        return
+    instance._old_authorization = model._base_manager.filter(pk=instance.pk).values(*field_names).first()
+
+
+def fields_changed(instance, field_names):
+    old = instance.__dict__.pop('_old_authorization', None)
+    return old is not None and any(old[name] != getattr(instance, name) for name in field_names)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_authorization(sender, instance, update_fields=None, **kwargs):
+    remember_fields(User, instance, USER_AUTHORIZATION_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    if fields_changed(instance, USER_AUTHORIZATION_FIELDS):
+        invalidate_principal(instance.pk)
+
+
+@receiver(pre_save, sender=Seller)
+def remember_seller_authorization(sender, instance, update_fields=None, **kwargs):
+    remember_fields(Seller, instance, SELLER_AUTHORIZATION_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=Seller)
+def invalidate_seller_principal(sender, instance, created=False, **kwargs):
+    # A new seller changes the seller_id claim
+    if created or fields_changed(instance, SELLER_AUTHORIZATION_FIELDS):
+        invalidate_principal(instance.user_id)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Seller)
+def invalidate_deleted_principal(sender, instance, **kwargs):
+    invalidate_principal(instance.user_id if sender is Seller else instance.pk)
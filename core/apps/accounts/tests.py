@@ -1,3 +1,114 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..sellers.models import Seller
+from ..common.cache import bump_versions
+from .authentication import VERSION_CLAIM, ClaimsJWTAuthentication
+from .blacklist import BLACKLIST_SCOPE, BlacklistFilter, is_blacklisted
+from .models import User
+from .serializers import CustomTokenObtainPairSerializer
+
+
+DUMMY_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def make_seller(user, is_approved=False):
+    return Seller.objects.create(user=user, business_name='Shop', inn_number='1', phone_number='1',
+                                 business_description='d', business_address='a', city='c', postal_code='1',
+                                 bank_name='b', bic_bank_number='1', bank_account_number='1',
+                                 bank_routing_number='1', is_approved=is_approved)
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('Test', 'User', 'user@example.com', 'password')
+
+    def tokens(self):
+        return CustomTokenObtainPairSerializer.get_token(self.user)
+
+    def authenticate(self, access):
+        authentication = ClaimsJWTAuthentication()
+        return authentication.get_user(authentication.get_validated_token(str(access)))
+
+    def test_current_claims_are_trusted_without_query(self):
+        access = self.tokens().access_token
+        with self.assertNumQueries(0):
+            user = self.authenticate(access)
+        self.assertEqual((user.pk, user.account_type, user.seller_id), (self.user.pk, 'BUYER', None))
+
+    def test_changed_user_falls_back_to_database(self):
+        access = self.tokens().access_token
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.account_type = 'SELLER'
+            self.user.save()
+        self.assertEqual(self.authenticate(access).account_type, 'SELLER')
+
+    def test_deactivated_user_is_rejected(self):
+        access = self.tokens().access_token
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaisesMessage(AuthenticationFailed, "User is inactive"):
+            self.authenticate(access)
+
+    @override_settings(CACHES=DUMMY_CACHE)
+    def test_claims_are_not_trusted_without_versions(self):
+        access = self.tokens().access_token
+        self.assertIsNone(access[VERSION_CLAIM])
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaisesMessage(AuthenticationFailed, "User is inactive"):
+            self.authenticate(access)
+
+    def test_refresh_restamps_claims(self):
+        refresh = self.tokens()
+        with self.captureOnCommitCallbacks(execute=True):
+            seller = make_seller(self.user, is_approved=True)
+        response = APIClient().post('/auth/token/refresh/', {'refresh': str(refresh)}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        access = AccessToken(response.json()['access'])
+        self.assertEqual((access['seller_id'], access['seller_approved']), (str(seller.pk), True))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(access).seller_id, seller.pk)
+
+
+class BlacklistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('Test', 'User', 'user@example.com', 'password')
+
+    def blacklist(self, jti, blacklisted_at=None):
+        # As another process would, without touching this process's filter
+        token = OutstandingToken.objects.create(user=self.user, jti=jti, token=jti, expires_at=self.user.created_at)
+        row = BlacklistedToken.objects.create(token=token)
+        if blacklisted_at is not None:
+            BlacklistedToken.objects.filter(pk=row.pk).update(blacklisted_at=blacklisted_at)
+        return row
+
+    def test_process_cache_checks_the_database(self):
+        self.assertFalse(is_blacklisted('first'))
+        self.blacklist('first')
+        self.assertTrue(is_blacklisted('first'))
+
+    def test_rows_committed_out_of_order_are_loaded(self):
+        blacklist_filter = BlacklistFilter(capacity=100)
+        latest = self.blacklist('latest')
+        self.assertTrue(blacklist_filter.might_contain('latest'))
+        # Inserted before `latest` but committed after it
+        self.blacklist('earlier', blacklisted_at=latest.blacklisted_at - timedelta(minutes=1))
+        bump_versions(BLACKLIST_SCOPE)
+        self.assertTrue(blacklist_filter.might_contain('earlier'))
+
+    def test_filter_answers_with_shared_cache(self):
+        self.blacklist('first')
+        with mock.patch('apps.accounts.blacklist.cache_is_shared', return_value=True):
+            self.assertTrue(is_blacklisted('first'))
+            with self.assertNumQueries(0):
+                self.assertFalse(is_blacklisted('other'))
@@ -4,13 +4,15 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 from drf_spectacular.utils import extend_schema, extend_schema_view
 
-from .serializers import CreateUserSerializer, CustomTokenObtainPairSerializer
+from .serializers import CreateUserSerializer, CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer, \
+    CustomTokenVerifySerializer
+from ..common.timing import ServerTimingMixin
 
 
 auth_tag = ['Authentication']
 
 
-class RegisterApiView(APIView):
+class RegisterApiView(ServerTimingMixin, APIView):
     serializer_class = CreateUserSerializer
 
     @extend_schema(
@@ -32,7 +34,7 @@ class RegisterApiView(APIView):
         tags=auth_tag
     )
 )
-class CustomTokenObtainPairView(TokenObtainPairView):
+class CustomTokenObtainPairView(ServerTimingMixin, TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 
@@ -42,8 +44,8 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         tags=auth_tag
     )
 )
-class CustomTokenRefreshView(TokenRefreshView):
-    pass
+class CustomTokenRefreshView(ServerTimingMixin, TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
 
 
 @extend_schema_view(
@@ -52,5 +54,5 @@ class CustomTokenRefreshView(TokenRefreshView):
         tags=auth_tag
     )
 )
-class CustomTokenVerifyView(TokenVerifyView):
-    pass
+class CustomTokenVerifyView(ServerTimingMixin, TokenVerifyView):
+    serializer_class = CustomTokenVerifySerializer
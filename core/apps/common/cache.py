@@ -0,0 +1,219 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .conditional import make_etag, not_modified, representation_hash
+
+
+VERSION_KEY_PREFIX = 'version'
+RESPONSE_KEY_PREFIX = 'response'
+STATS_KEYS = {'hit': 'response-cache:hits', 'miss': 'response-cache:misses'}
+
+
+def version_key(scope: str) -> str:
+    return f'{VERSION_KEY_PREFIX}:{scope}'
+
+
+def cache_is_shared() -> bool:
+    """Whether versions bumped by one process are seen by the others."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def get_versions(scopes) -> dict:
+    """
+    Return current version of every scope, initializing missing ones.
+
+    New versions start from the current time in nanoseconds, so a counter that was
+    evicted from the cache never comes back with a value it already had.
+    """
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return {scope: versions[version_key(scope)] for scope in scopes}
+
+
+async def aget_versions(scopes) -> dict:
+    keys = [version_key(scope) for scope in scopes]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return {scope: versions[version_key(scope)] for scope in scopes}
+
+
+def bump_versions(*scopes) -> None:
+    for scope in set(scopes):
+        try:
+            cache.incr(version_key(scope))
+        except ValueError:
+            cache.set(version_key(scope), time.time_ns(), timeout=None)
+
+
+def invalidate(*scopes) -> None:
+    """Bump scope versions once the current transaction commits."""
+    if scopes:
+        transaction.on_commit(lambda: bump_versions(*scopes))
+
+
+def record_stat(outcome: str) -> None:
+    key = STATS_KEYS[outcome]
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def arecord_stat(outcome: str) -> None:
+    key = STATS_KEYS[outcome]
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+def get_stats() -> dict:
+    values = cache.get_many(STATS_KEYS.values())
+    stats = {outcome: values.get(key, 0) for outcome, key in STATS_KEYS.items()}
+    requests = stats['hit'] + stats['miss']
+    stats['hit_ratio'] = stats['hit'] / requests if requests else 0.0
+    return stats
+
+
+def reset_stats() -> None:
+    cache.delete_many(STATS_KEYS.values())
+
+
+def response_key(request, versions: dict) -> str:
+    return f'{RESPONSE_KEY_PREFIX}:{representation_hash(request, versions)}'
+
+
+class CachedResponse(Exception):
+    """Raised by CachedResponseMixin.initial() to send `response` instead of running the handler."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class CachedResponseMixin:
+    """
+    Caches rendered GET responses of a view by URL, normalized query parameters and
+    the versions of the scopes returned by get_cache_scopes(). Writes invalidate
+    pages by bumping scope versions, so a stale page is never looked up again.
+    The cache is looked up after authentication, permission and throttle checks,
+    and only JSON is cached: browsable API pages show the user and a CSRF token.
+
+    The same versions make the ETag of successful responses, a request whose
+    If-None-Match still has it is answered with 304 before the cache or the view
+    are asked. Without a cache keeping versions (dummy backend) there's no ETag.
+    Versions have to be shared by every worker, which needs Redis (REDIS_URL):
+    with the local memory cache only the worker making a change sees it.
+    """
+    cache_timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60 * 15)
+    # Set by initial() when the response is looked up and missing, dispatch() caches it then
+    cache_key = None
+    etag = None
+
+    def get_cache_scopes(self, request, *args, **kwargs):
+        return []
+
+    def use_cache(self, request):
+        return request.method == 'GET' and isinstance(getattr(request, 'accepted_renderer', None), JSONRenderer)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Async views look the cache up in ainitial()
+        if self.view_is_async or not self.use_cache(request):
+            return
+        key = self.prepare_lookup(request, get_versions(self.get_cache_scopes(request, *args, **kwargs)))
+        cached = cache.get(key)
+        if cached is not None:
+            record_stat('hit')
+            raise CachedResponse(self.with_etag(self.cached_response(cached), self.etag))
+        record_stat('miss')
+        self.cache_key = key
+
+    async def ainitial(self, request, *args, **kwargs):
+        await super().ainitial(request, *args, **kwargs)
+        if not self.use_cache(request):
+            return
+        key = self.prepare_lookup(request, await aget_versions(self.get_cache_scopes(request, *args, **kwargs)))
+        cached = await cache.aget(key)
+        if cached is not None:
+            await arecord_stat('hit')
+            raise CachedResponse(self.with_etag(self.cached_response(cached), self.etag))
+        await arecord_stat('miss')
+        self.cache_key = key
+
+    def prepare_lookup(self, request, versions):
+        """Raise CachedResponse with a 304 when If-None-Match has the ETag, return the cache key otherwise."""
+        self.etag = self.get_etag(request, versions)
+        response = not_modified(request, self.etag) if self.etag else None
+        if response is not None:
+            raise CachedResponse(response)
+        return response_key(request, versions)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, CachedResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.adispatch(request, *args, **kwargs)
+        response = super().dispatch(request, *args, **kwargs)
+        if self.cache_key is not None:
+            if self.is_cacheable(response):
+                cache.set(self.cache_key, self.freeze_response(response), self.cache_timeout)
+            response['X-Cache'] = 'MISS'
+            response = self.with_etag(response, self.etag)
+        return response
+
+    async def adispatch(self, request, *args, **kwargs):
+        response = await super().dispatch(request, *args, **kwargs)
+        if self.cache_key is not None:
+            if self.is_cacheable(response):
+                await cache.aset(self.cache_key, self.freeze_response(response), self.cache_timeout)
+            response['X-Cache'] = 'MISS'
+            response = self.with_etag(response, self.etag)
+        return response
+
+    @staticmethod
+    def get_etag(request, versions):
+        # Without scopes or versions nothing tells when the response changes
+        if not versions or any(version is None for version in versions.values()):
+            return None
+        return make_etag(request, versions)
+
+    def with_etag(self, response, etag):
+        if etag and self.is_cacheable(response):
+            response['ETag'] = etag
+        return response
+
+    @staticmethod
+    def is_cacheable(response):
+        return response.status_code == 200 and not response.streaming
+
+    @staticmethod
+    def freeze_response(response):
+        if hasattr(response, 'render'):
+            response.render()
+        return response.content, response.status_code, response['Content-Type']
+
+    @staticmethod
+    def cached_response(cached):
+        content, status, content_type = cached
+        response = HttpResponse(content, status=status, content_type=content_type)
+        response['X-Cache'] = 'HIT'
+        return response
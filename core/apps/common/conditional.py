@@ -0,0 +1,35 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+
+
+def representation_hash(request, versions: dict) -> str:
+    """Hash of the URL, normalized query parameters and Accept header of a request, and `versions`."""
+    query = sorted((key, sorted(values)) for key, values in request.GET.lists())
+    parts = [request.build_absolute_uri(request.path), repr(query),
+             request.META.get('HTTP_ACCEPT', ''), repr(sorted(versions.items()))]
+    return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+def make_etag(request, validators: dict) -> str:
+    """Strong ETag of the response to `request` for as long as `validators` stay the same."""
+    return f'"{representation_hash(request, validators)}"'
+
+
+def queryset_validators(queryset, *fields) -> dict:
+    """
+    Row count and newest `fields` (updated_at by default) of a queryset, in one
+    aggregate query. The count catches deleted rows and soft deletes, which leave
+    updated_at alone.
+    """
+    fields = fields or ('updated_at',)
+    return queryset.order_by().aggregate(count=Count('pk'), **{field: Max(field) for field in fields})
+
+
+def not_modified(request, etag):
+    """304 Not Modified response when If-None-Match of a GET has `etag`, None otherwise."""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+    return response
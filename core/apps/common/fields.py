@@ -0,0 +1,51 @@
+from functools import reduce
+from operator import or_
+
+from autoslug import AutoSlugField
+from autoslug.utils import crop_slug, get_prepopulated_value
+from django.db.models import Q
+
+
+class BatchAutoSlugField(AutoSlugField):
+    """
+    AutoSlugField that keeps a slug reserved in advance by `reserve_unique_slugs`
+    instead of probing the database for a free one row by row.
+    """
+
+    def pre_save(self, instance, add):
+        if add and getattr(instance, '_slug_reserved', False):
+            return self.value_from_object(instance)
+        return super().pre_save(instance, add)
+
+
+def reserve_unique_slugs(instances, field_name='slug', batch_size=200):
+    """
+    Populate unique slugs for unsaved instances with one query per batch of
+    distinct base slugs, using the same `<slug>-<index>` scheme as AutoSlugField.
+    """
+    if not instances:
+        return
+    model = type(instances[0])
+    field = model._meta.get_field(field_name)
+    bases = []
+    for instance in instances:
+        base = crop_slug(field, field.slugify(get_prepopulated_value(field, instance) or '')) or model._meta.model_name
+        bases.append(base)
+
+    taken = set()
+    distinct_bases = list(set(bases))
+    for i in range(0, len(distinct_bases), batch_size):
+        batch = distinct_bases[i:i + batch_size]
+        rivals = reduce(or_, (Q(**{field_name: base}) | Q(**{f'{field_name}__startswith': f'{base}{field.index_sep}'})
+                              for base in batch))
+        taken.update(model._base_manager.filter(rivals).values_list(field_name, flat=True))
+
+    for instance, base in zip(instances, bases):
+        slug, index = base, 1
+        while slug in taken:
+            index += 1
+            tail = f'{field.index_sep}{index}'
+            slug = f'{base[:field.max_length - len(tail)]}{tail}'
+        taken.add(slug)
+        setattr(instance, field_name, slug)
+        instance._slug_reserved = True
@@ -0,0 +1,138 @@
+from django.core.exceptions import FieldDoesNotExist
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import BaseSerializer
+
+
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+
+FIELDSET_PARAMS = [
+    OpenApiParameter(
+        name=FIELDS_PARAM,
+        description="Comma separated fields to return, the others are left out of the response and of the query",
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+    OpenApiParameter(
+        name=EXCLUDE_PARAM,
+        description="Comma separated fields to leave out of the response and of the query",
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+]
+
+
+def requested_fieldset(request, field_names, excluded=()) -> dict:
+    """
+    `fields` and `exclude_fields` serializer arguments for the `?fields=` and
+    `?exclude=` query parameters. `field_names` are the fields the client can
+    choose from, `excluded` fields are always left out.
+    """
+    fieldset = {'exclude_fields': list(excluded)} if excluded else {}
+    available = [name for name in field_names if name not in excluded]
+    for param, argument in ((FIELDS_PARAM, 'fields'), (EXCLUDE_PARAM, 'exclude_fields')):
+        value = request.query_params.get(param)
+        if value is None:
+            continue
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError({param: f"Unknown fields: {', '.join(unknown)}. "
+                                          f"Choose from: {', '.join(available)}"})
+        fieldset[argument] = fieldset.get(argument, []) + names
+    return fieldset
+
+
+def field_paths(serializer, model):
+    """
+    only() paths and select_related() relations covering what the fields of
+    `serializer` read from `model`, following their sources into nested
+    serializers. A source that isn't a column or a forward relation (a property,
+    a method, a SerializerMethodField) needs the whole row of the model it's read
+    from, then no path below that model is returned, and None for paths when it's
+    `model` itself.
+    """
+    paths, related, whole = set(), set(), set()
+
+    def walk(serializer, model, prefix):
+        for field in serializer.fields.values():
+            current, path = model, prefix
+            for attr in field.source_attrs:
+                try:
+                    model_field = current._meta.get_field(attr)
+                except FieldDoesNotExist:
+                    whole.add(path)
+                    break
+                if not model_field.concrete or model_field.many_to_many:
+                    whole.add(path)
+                    break
+                if model_field.is_relation:
+                    paths.add(path + attr)
+                    related.add(path + attr)
+                    current, path = model_field.related_model, f'{path}{attr}__'
+                    continue
+                # Attributes after a column read into its value, like the url of a FieldFile
+                paths.add(path + attr)
+                break
+            else:
+                # The source is '*' or ends on a related object
+                if isinstance(field, BaseSerializer) and not getattr(field, 'many', False):
+                    walk(field, current, path)
+                else:
+                    whole.add(path)
+
+    walk(serializer, model, '')
+    if '' in whole:
+        return None, related
+    # Relations below a model loaded whole must not restrict it to their foreign keys either
+    paths = {path for path in paths if not any(path.startswith(prefix) for prefix in whole)}
+    return paths, related
+
+
+def prune_queryset(queryset, serializer):
+    """
+    Load only the columns and joins `serializer` reads, keeping the columns the
+    queryset is ordered by, which cursor pagination reads positions from.
+    Querysets of related managers (product.reviews) read the foreign key to the
+    parent of every row, filter the model's manager instead.
+    """
+    paths, related = field_paths(serializer, queryset.model)
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    if paths is None:
+        return queryset
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    columns = {field.attname for field in queryset.model._meta.concrete_fields} | \
+              {field.name for field in queryset.model._meta.concrete_fields}
+    paths.update(name for name in (field.lstrip('-') for field in ordering if isinstance(field, str))
+                 if name in columns)
+    return queryset.only(*paths)
+
+
+class FieldsetMixin:
+    """
+    Generic view mixin passing `?fields=` and `?exclude=` to get_serializer() and
+    pruning the filtered queryset to the fields left. The fields to choose from
+    are the declared fields of serializer_class, minus `excluded_fields`.
+    """
+    excluded_fields = ()
+
+    def get_fieldset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return {}
+        if not hasattr(self, 'fieldset'):
+            self.fieldset = requested_fieldset(self.request, self.serializer_class._declared_fields,
+                                               self.excluded_fields)
+        return self.fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        return super().get_serializer(*args, **self.get_fieldset(), **kwargs)
+
+    def filter_queryset(self, queryset):
+        # Pruned last, filters and ordering may need any column
+        return self.prune_queryset(super().filter_queryset(queryset))
+
+    def prune_queryset(self, queryset):
+        return prune_queryset(queryset, self.get_serializer())
@@ -0,0 +1,158 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+# Longest side of every rendition, originals smaller than that are not upscaled
+RENDITION_SIZES = {
+    'thumbnail': 160,
+    'card': 480,
+    'detail': 1200,
+}
+
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'IMAGE_WORKERS', 2),
+                                       thread_name_prefix='renditions')
+    return _executor
+
+
+def rendition_name(name: str, size: str, extension: str) -> str:
+    """
+    `product_images/phone.jpg` -> `product_images/phone.jpg.card.webp`, next to the
+    original. The original's extension is kept, so `phone.png` gets other files.
+    """
+    return f'{name}.{size}.{extension}'
+
+
+def encode(image, image_format, options) -> bytes:
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def render_image(name: str, overwrite=False, storage=default_storage) -> dict:
+    """
+    Write every rendition of a stored image and return their names as
+    {'source': name, '<size>': {'<format>': name}}. Renditions already written
+    for the same original are reused unless `overwrite` is set.
+    """
+    renditions = {'source': name}
+    for size in RENDITION_SIZES:
+        renditions[size] = {extension: rendition_name(name, size, extension) for extension in RENDITION_FORMATS}
+    paths = [path for size in RENDITION_SIZES for path in renditions[size].values()]
+    if not overwrite and all(storage.exists(path) for path in paths):
+        return renditions
+
+    with storage.open(name, 'rb') as file:
+        original = ImageOps.exif_transpose(Image.open(file))
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+    for size, side in RENDITION_SIZES.items():
+        image = original.copy()
+        image.thumbnail((side, side), Image.LANCZOS)
+        for extension, (image_format, options) in RENDITION_FORMATS.items():
+            path = renditions[size][extension]
+            if storage.exists(path):
+                storage.delete(path)
+            renditions[size][extension] = storage.save(path, ContentFile(encode(image, image_format, options)))
+    return renditions
+
+
+def stale_fields(instance, field_names, retry_failed=False) -> list:
+    """
+    Image fields whose renditions were made from another file than the current
+    one. Files that couldn't be rendered count as done unless `retry_failed`
+    is set, saving the row again doesn't make them renderable.
+    """
+    renditions = instance.renditions or {}
+    stale = []
+    for field_name in field_names:
+        rendered = renditions.get(field_name, {})
+        if ((getattr(instance, field_name).name or None) != rendered.get('source')
+                or (retry_failed and rendered.get('failed'))):
+            stale.append(field_name)
+    return stale
+
+
+def update_renditions(model, pk, field_names, on_done=None):
+    """
+    Render the given image fields of one row and store the result in its
+    `renditions` column, {'source': name, 'failed': True} for files that can't be.
+    """
+    instance = model._base_manager.filter(pk=pk).only('pk', 'renditions', *field_names).first()
+    if instance is None:
+        return None
+    renditions = dict(instance.renditions or {})
+    for field_name in field_names:
+        name = getattr(instance, field_name).name
+        if not name:
+            renditions.pop(field_name, None)
+            continue
+        try:
+            renditions[field_name] = render_image(name)
+        except Exception:
+            logger.exception("Can't render %s of %s %s", field_name, model._meta.label, pk)
+            # Not stale anymore, so the next save doesn't queue the same file again
+            renditions[field_name] = {'source': name, 'failed': True}
+    model._base_manager.filter(pk=pk).update(renditions=renditions)
+    if on_done:
+        on_done(pk)
+    return renditions
+
+
+def run_in_worker(function, *args):
+    # Worker threads get their own database connections
+    close_old_connections()
+    try:
+        return function(*args)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(model, pk, field_names, on_done=None):
+    """Render images on the worker pool once the current transaction commits."""
+    if not field_names:
+        return
+    if not getattr(settings, 'IMAGE_WORKERS', 2):
+        transaction.on_commit(lambda: update_renditions(model, pk, field_names, on_done))
+        return
+    transaction.on_commit(lambda: get_executor().submit(run_in_worker, update_renditions, model, pk, field_names, on_done))
+
+
+def register_renditions(model, field_names, on_done=None):
+    """
+    Regenerate renditions of the model's image fields in the background every time
+    a saved file differs from the one the stored renditions were made from.
+    `on_done(pk)` runs after the renditions of a row are updated.
+    """
+    def handler(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or (update_fields is not None and not update_fields & set(field_names)):
+            return
+        schedule_renditions(model, instance.pk, stale_fields(instance, field_names), on_done)
+
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=f'renditions:{model._meta.label}')
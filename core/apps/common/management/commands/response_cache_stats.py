@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ...cache import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss statistics of the versioned response cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Reset the counters after printing them")
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        self.stdout.write(f"hits: {stats['hit']}\nmisses: {stats['miss']}\nhit ratio: {stats['hit_ratio']:.2%}")
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
@@ -9,6 +9,12 @@ class GetOrNoneQuerySet(models.QuerySet):
         except self.model.DoesNotExist:
             return None
 
+    async def aget_or_none(self, *args, **kwargs):
+        try:
+            return await self.aget(*args, **kwargs)
+        except self.model.DoesNotExist:
+            return None
+
 
 class GetOrNoneManager(models.Manager):
     def get_queryset(self, *args, **kwargs):
@@ -17,6 +23,9 @@ class GetOrNoneManager(models.Manager):
     def get_or_none(self, **kwargs):
         return self.get_queryset().get_or_none(**kwargs)
 
+    async def aget_or_none(self, **kwargs):
+        return await self.get_queryset().aget_or_none(**kwargs)
+
 
 class IsDeletedQuerySet(GetOrNoneQuerySet):
     def delete(self, hard_delete=False):
@@ -27,11 +36,13 @@ class IsDeletedQuerySet(GetOrNoneQuerySet):
 
 
 class IsDeletedManager(GetOrNoneManager):
+    queryset_class = IsDeletedQuerySet
+
     def get_queryset(self):
-        return IsDeletedQuerySet(self.model).filter(is_deleted=False)
+        return self.queryset_class(self.model).filter(is_deleted=False)
 
     def unfiltered(self):
-        return IsDeletedQuerySet(self.model)
+        return self.queryset_class(self.model)
 
     def hard_delete(self):
         return self.unfiltered().delete(hard_delete=True)
@@ -1,15 +1,203 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CustomCursorPagination(BasePagination):
+    """
+    Keyset pagination. Pages are fetched by seeking past the ordering values of the
+    last seen row instead of using OFFSET, and no COUNT query is made.
+    The queryset's own ordering is used, made unique with the primary key.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.build_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.build_page([row async for row in self.get_page_queryset(queryset, request)])
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.position, self.reverse = self.decode_cursor(request)
+        if self.position is not None:
+            self.position = self.convert_position(queryset.model, self.position)
+        ordering = [self.flip(field) for field in self.ordering] if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.get_seek_filter())
+        return queryset[:self.page_size + 1]
+
+    def build_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+        get_position = attrgetter(*(field.lstrip('-').replace('__', '.') for field in self.ordering))
+        positions = [get_position(row) for row in (rows[0], rows[-1])] if rows else []
+        if len(self.ordering) == 1:
+            positions = [(position,) for position in positions]
+        self.first_position, self.last_position = positions or (None, None)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'result': data
+        })
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param],
+                                 strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering or self.ordering)
+        if not all(isinstance(field, str) for field in ordering):
+            ordering = list(self.ordering)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def get_seek_filter(self):
+        # (a, b) after (x, y)  =>  a > x OR (a = x AND b > y)
+        seek, equal = Q(), {}
+        for field, value in zip(self.ordering, self.position):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != self.reverse
+            seek |= Q(**equal, **{f"{name}__{'lt' if descending else 'gt'}": value})
+            equal[name] = value
+        return seek
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position, reverse = cursor['p'], bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        # encode_cursor() writes every value as a string
+        if (not isinstance(position, list) or len(position) != len(self.ordering)
+                or not all(value is None or isinstance(value, str) for value in position)):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def convert_position(self, model, position):
+        """Cursor values as the ordering fields take them, a value a field rejects makes the cursor invalid."""
+        converted = []
+        for field, value in zip(self.ordering, position):
+            model_field = self.get_model_field(model, field.lstrip('-'))
+            if value is not None and model_field is not None:
+                try:
+                    value = model_field.to_python(value)
+                except (ValidationError, TypeError, ValueError):
+                    raise NotFound(self.invalid_cursor_message)
+            converted.append(value)
+        return converted
+
+    @staticmethod
+    def get_model_field(model, path):
+        # None for annotations, their values are compared as they are
+        field = None
+        for name in path.split('__'):
+            try:
+                field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if field.is_relation:
+                model = field.related_model
+        return field
+
+    def encode_cursor(self, position, reverse=False):
+        cursor = {'p': [None if value is None else str(value) for value in position]}
+        if reverse:
+            cursor['r'] = 1
+        encoded = urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode('ascii')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.encode_cursor(self.last_position)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self.encode_cursor(self.first_position, reverse=True)
 
 
 class CustomNumberPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 50
+    # Clients opt in to keyset pagination by sending `cursor` (empty for the first page)
+    cursor_pagination_class = CustomCursorPagination
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_pagination_class.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if self.cursor_pagination_class.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return await self.cursor_paginator.apaginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached_property, fill it so page lookups don't count synchronously
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        bottom = (number - 1) * page_size
+        top = bottom + page_size
+        if top + paginator.orphans >= paginator.count:
+            top = paginator.count
+        rows = [row async for row in queryset[bottom:top]]
+        self.page = paginator._get_page(rows, number, paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return rows
 
     def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
         return Response({
             'page_number': self.page.number,
             'total_pages': self.page.paginator.num_pages,
             'result': data
         })
-
@@ -6,16 +6,16 @@ class IsOwner(BasePermission):
         return request.user.is_authenticated
 
     def has_object_permission(self, request, view, obj):
-        return obj.user == request.user or request.user.is_staff
+        return obj.user_id == request.user.id or request.user.is_staff
 
 
 class IsSeller(BasePermission):
     def has_permission(self, request, view):
         return (request.user.is_authenticated and request.user.account_type == 'SELLER' and
-                request.user.seller.is_approved) or request.user.is_staff
+                request.user.seller_approved) or request.user.is_staff
 
     def has_object_permission(self, request, view, obj):
-        return obj.seller == request.user.seller or request.user.is_staff
+        return (obj.seller_id is not None and obj.seller_id == request.user.seller_id) or request.user.is_staff
 
 
 class IsStaff(BasePermission):
@@ -0,0 +1,56 @@
+try:
+    import orjson
+except ImportError:
+    # Without orjson everything is encoded by the json module, like JSONRenderer does
+    orjson = None
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .timing import timed
+
+
+# Dict keys are converted like json.dumps() does. datetimes are passed to the encoder,
+# which writes UTC as `Z` where orjson writes `+00:00`
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+_encoder = JSONEncoder()
+
+
+def orjson_dumps(data, default=_encoder.default):
+    """
+    Compact UTF-8 JSON of `data` as bytes, or None when orjson isn't installed or
+    can't encode it (integers over 64 bits, nesting deeper than 255 levels).
+    Types orjson doesn't know, like Decimal and lazy strings, are encoded by
+    `default`, which is DRF's JSONEncoder.
+    """
+    if orjson is None:
+        return None
+    try:
+        return orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        return None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson when it's installed. The output is the same
+    as JSONRenderer's, except for NaN and infinite floats, which orjson writes as
+    null where JSONRenderer fails. Indented, ASCII-only and non-compact output
+    is left to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Timed here rather than around Response.render(), views may render before the middleware sees the response
+        with timed('render'):
+            return self.encode(data, accepted_media_type, renderer_context)
+
+    def encode(self, data, accepted_media_type, renderer_context):
+        if (data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        encoder = self.encoder_class()
+        ret = orjson_dumps(data, encoder.default)
+        if ret is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer does, they are valid in JSON but not in JavaScript strings
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -1,20 +1,53 @@
-from rest_framework.serializers import Serializer
+from django.core.files.storage import default_storage
+from rest_framework.serializers import ReadOnlyField, Serializer
 
 
 class DymanicFieldSerializer(Serializer):
     """
-    A Serializer that takes an additional `exclude_fields` argument that
-    controls which fields should be dropped.
+    A Serializer that takes additional `fields` and `exclude_fields` arguments
+    that control which fields should be kept and which dropped.
     """
 
     def __init__(self, *args, **kwargs):
-        # Don't pass the 'fields' arg up to the superclass
-        fields = kwargs.pop('exclude_fields', None)
+        # Don't pass the 'fields' and 'exclude_fields' args up to the superclass
+        fields = kwargs.pop('fields', None)
+        excluded = kwargs.pop('exclude_fields', None)
 
         # Instantiate the superclass normally
         super().__init__(*args, **kwargs)
 
         if fields is not None:
+            # Drop any fields that aren't specified in the `fields` argument.
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+        if excluded is not None:
             # Drop any fields that are specified in the `exclude_fields` argument.
-            for field_name in fields:
-                self.fields.pop(field_name)
\ No newline at end of file
+            for field_name in excluded:
+                self.fields.pop(field_name, None)
+
+
+def rendition_urls(renditions, request=None) -> dict:
+    """{'<image field>': {'<size>': {'<format>': url}}} of a `renditions` column value."""
+    result = {}
+    for field_name, sizes in renditions.items():
+        result[field_name] = {}
+        for size, names in sizes.items():
+            if size in ('source', 'failed'):
+                continue
+            urls = {extension: default_storage.url(name) for extension, name in names.items()}
+            if request is not None:
+                urls = {extension: request.build_absolute_uri(url) for extension, url in urls.items()}
+            result[field_name][size] = urls
+    return result
+
+
+class RenditionsField(ReadOnlyField):
+    """
+    Exposes the `renditions` column of a model as
+    {'<image field>': {'<size>': {'<format>': url}}}, urls are absolute when
+    the request is in the serializer context, like ImageField's.
+    """
+
+    def to_representation(self, value):
+        return rendition_urls(value or {}, self.context.get('request'))
@@ -1,3 +1,150 @@
-from django.test import TestCase
+import json
+from base64 import urlsafe_b64encode
+from io import BytesIO
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from PIL import Image
+from rest_framework.test import APIClient
+
+from ..accounts.models import User
+from ..shop.models import Category
+from ..shop.tests import make_catalog
+from .images import stale_fields
+from .paginations import CustomCursorPagination
+from .serializers import rendition_urls
+from .utils import NODE_BITS, SEQUENCE_BITS, CodeGenerator
+
+
+def encode(cursor) -> str:
+    return urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(7):
+            User.objects.create_user('Test', 'User', f'user{i}@example.com', 'password')
+
+    def paginate(self, cursor='', page_size=3):
+        paginator = CustomCursorPagination()
+        request = Request(RequestFactory().get('/users/', {'cursor': cursor, 'page_size': page_size}))
+        rows = paginator.paginate_queryset(User.objects.all(), request)
+        return paginator, rows
+
+    @staticmethod
+    def cursor_of(link):
+        return parse_qs(urlparse(link).query)['cursor'][0]
+
+    def test_pages_cover_the_ordering(self):
+        expected = list(User.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        paginator, rows = self.paginate()
+        seen = [row.id for row in rows]
+        self.assertIsNone(paginator.get_previous_link())
+        while paginator.get_next_link():
+            paginator, rows = self.paginate(self.cursor_of(paginator.get_next_link()))
+            seen += [row.id for row in rows]
+        self.assertEqual(seen, expected)
+
+        paginator, rows = self.paginate(self.cursor_of(paginator.get_previous_link()))
+        self.assertEqual([row.id for row in rows], expected[3:6])
+
+    def test_invalid_cursors_are_not_found(self):
+        user = User.objects.first()
+        for cursor in ['garbage', encode({'x': 1}), encode({'p': ['2025-01-01']}),
+                       encode({'p': ['notadate', 'zzz'], 'r': 1}), encode({'p': [str(user.created_at), 'zzz']}),
+                       encode({'p': [1, 2]}), encode({'p': [['a'], str(user.id)]})]:
+            with self.subTest(cursor=cursor), self.assertRaises(NotFound):
+                self.paginate(cursor)
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_catalog()
+
+    def timed_get(self, path):
+        with self.assertLogs('apps.common.timing', 'INFO') as logs:
+            response = APIClient().get(path)
+        return response, json.loads(logs.records[0].getMessage())
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_cached_view_times_serializing_and_rendering(self):
+        response, timings = self.timed_get('/shop/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+        self.assertGreater(timings['queries'], 0)
+        self.assertGreater(timings['serialize_ms'], 0)
+        # Rendered by the view, to be cached, before the middleware gets the response
+        self.assertGreater(timings['render_ms'], 0)
+
+        response, timings = self.timed_get('/shop/products/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual((timings['queries'], timings['serialize_ms'], timings['render_ms']), (0, 0, 0))
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_have_no_header(self):
+        self.assertNotIn('Server-Timing', APIClient().get('/shop/products/'))
+
+
+@override_settings(IMAGE_WORKERS=0, STORAGES={'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+                                              'staticfiles': {'BACKEND': 'django.core.files.storage.InMemoryStorage'}})
+class RenditionTests(TestCase):
+    def create_category(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Category.objects.create(name=image, image=image)
+
+    def test_renditions_keep_the_original_extension(self):
+        for name in ('category_images/phone.jpg', 'category_images/phone.png'):
+            buffer = BytesIO()
+            Image.new('RGB', (600, 300), 'red').save(buffer, 'PNG')
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+        jpg = self.create_category('category_images/phone.jpg')
+        png = self.create_category('category_images/phone.png')
+        jpg.refresh_from_db()
+        png.refresh_from_db()
+        self.assertEqual(jpg.renditions['image']['card'],
+                         {'webp': 'category_images/phone.jpg.card.webp', 'jpeg': 'category_images/phone.jpg.card.jpeg'})
+        self.assertEqual(png.renditions['image']['card']['webp'], 'category_images/phone.png.card.webp')
+
+    def test_failed_render_is_not_queued_again(self):
+        with self.assertLogs('apps.common.images', 'ERROR'):
+            category = self.create_category('category_images/missing.jpg')
+        category.refresh_from_db()
+        self.assertEqual(category.renditions, {'image': {'source': 'category_images/missing.jpg', 'failed': True}})
+        self.assertEqual(stale_fields(category, Category.IMAGE_FIELDS), [])
+        self.assertEqual(stale_fields(category, Category.IMAGE_FIELDS, retry_failed=True), ['image'])
+        self.assertEqual(rendition_urls(category.renditions), {'image': {}})
+
+
+class CodeGeneratorTests(TestCase):
+    @override_settings(CODE_NODE_ID='7')
+    def test_configured_node(self):
+        generator = CodeGenerator()
+        generator()
+        self.assertEqual(generator.node, 7)
+
+    @override_settings(CODE_NODE_ID=None, REDIS_URL='redis://cache:6379/0')
+    def test_node_is_claimed_from_redis(self):
+        redis = mock.Mock()
+        redis.Redis.from_url.return_value.incr.side_effect = [1025, 1026]
+        with mock.patch.dict('sys.modules', redis=redis):
+            first, second = CodeGenerator(), CodeGenerator()
+            first_code, second_code = first(), second()
+        redis.Redis.from_url.assert_called_with('redis://cache:6379/0')
+        self.assertEqual((first.node, second.node), (1, 2))
+        self.assertNotEqual(first_code, second_code)
+
+    def test_codes_sort_by_creation(self):
+        generator = CodeGenerator()
+        # More than one millisecond's worth of sequence numbers
+        codes = [generator() for _ in range((1 << SEQUENCE_BITS) + 10)]
+        self.assertEqual(len(set(codes)), len(codes))
+        self.assertEqual(sorted(codes), codes)
+        self.assertLess(generator.node, 1 << NODE_BITS)
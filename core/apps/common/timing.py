@@ -0,0 +1,166 @@
+import json
+import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Timings of the request being handled, None when it isn't sampled
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('start', 'queries', 'db', 'serialize', 'render', 'handler_start', 'handler_db')
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.queries = 0
+        self.db = self.serialize = self.render = 0.0
+        self.handler_start = self.handler_db = None
+
+    def server_timing(self, total) -> str:
+        return (f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries", '
+                f'serialize;dur={self.serialize * 1000:.1f}, render;dur={self.render * 1000:.1f}, '
+                f'total;dur={total * 1000:.1f}')
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper of every connection, counts the queries of sampled requests."""
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db += perf_counter() - start
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """
+    connection_created receiver. Async views query from other threads than the
+    middleware runs in, so the wrapper goes on every connection instead of
+    connection.execute_wrapper() around the request.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to `name` of the timings of a sampled request."""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timings, name, getattr(timings, name) + perf_counter() - start)
+
+
+class ServerTimingMixin:
+    """
+    APIView mixin timing the handler of sampled requests, without the queries it
+    runs, as `serialize`: once authentication, permissions and throttles are
+    done, what a handler does besides querying is validating and building data
+    with serializers. Put it first, so mixins whose initial() may answer instead
+    of the handler, like CachedResponseMixin, run before the clock starts.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not self.view_is_async:
+            self.start_handler_timing()
+
+    async def ainitial(self, request, *args, **kwargs):
+        await super().ainitial(request, *args, **kwargs)
+        self.start_handler_timing()
+
+    @staticmethod
+    def start_handler_timing():
+        timings = current_timings.get()
+        if timings is not None:
+            timings.handler_start, timings.handler_db = perf_counter(), timings.db
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        timings = current_timings.get()
+        if timings is not None and timings.handler_start is not None:
+            timings.serialize += perf_counter() - timings.handler_start - (timings.db - timings.handler_db)
+            timings.handler_start = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ServerTimingMiddleware:
+    """
+    Adds a Server-Timing header with the query count and time spent on queries,
+    serializers and rendering to a SERVER_TIMING_SAMPLE_RATE share of requests,
+    and logs the same as a JSON line when SERVER_TIMING_LOG is set. Put it first
+    in MIDDLEWARE so `total` covers the other middleware too. `serialize` is
+    measured by views with ServerTimingMixin and `render` by renderers, wherever
+    the response is rendered, which for CachedResponseMixin is inside the view.
+
+    Streaming responses serialize while they are sent, after the header is
+    written, so their header only has the work done before.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0.0)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def finish(self, request, response, timings):
+        total = perf_counter() - timings.start
+        response['Server-Timing'] = timings.server_timing(total)
+        if not logger.isEnabledFor(logging.INFO):
+            return response
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'route': match.route if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(timings.db * 1000, 2),
+            'queries': timings.queries,
+            'serialize_ms': round(timings.serialize * 1000, 2),
+            'render_ms': round(timings.render * 1000, 2),
+        }))
+        return response
@@ -1,24 +1,85 @@
-import secrets
-from .models import BaseModel
+import os
+import threading
+import time
 
+from django.conf import settings
 
-def generate_unique_code(model: BaseModel, field: str) -> str:
+
+# Same characters as the random codes used before, sorted so codes sort by creation time
+CODE_ALPHABET = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+CODE_LENGTH = 12
+CODE_EPOCH_MS = 1735689600000  # 2025-01-01 UTC
+NODE_BITS = 10
+SEQUENCE_BITS = 10
+NODE_COUNTER_KEY = 'codes:node'
+
+
+class CodeGenerator:
     """
-    Generate a unique code for a specified model and field.
+    Time ordered codes that are unique without asking the database.
+
+    A code packs 41 bits of milliseconds since CODE_EPOCH_MS, 10 bits of node id
+    and a 10 bit per-millisecond sequence into 12 characters of CODE_ALPHABET
+    (35 ** 12 > 2 ** 61). Codes of one process never repeat, codes of different
+    processes differ by node id. Set CODE_NODE_ID (0-1023) to a different value
+    per process, or leave it unset and every process claims the next value of a
+    counter in Redis with its first code, once, so any 1024 processes started in
+    a row get different ids. Without either, which settings.py only allows with
+    DEBUG, there is a single process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.node = 0
+        self.last_ms = 0
+        self.sequence = 0
+
+    def get_node(self) -> int:
+        node = getattr(settings, 'CODE_NODE_ID', None)
+        if node is not None:
+            return int(node) % (1 << NODE_BITS)
+        if getattr(settings, 'REDIS_URL', None):
+            import redis
 
-    Args:
-        model (BaseModel): The model class to check for uniqueness.
-        field (str): The field name to check for uniqueness.
+            return redis.Redis.from_url(settings.REDIS_URL).incr(NODE_COUNTER_KEY) % (1 << NODE_BITS)
+        return 0
+
+    def next_value(self) -> int:
+        with self.lock:
+            if self.pid != os.getpid():
+                # Forked workers must not share the node id of their parent
+                self.pid, self.node = os.getpid(), self.get_node()
+            now = time.time_ns() // 1_000_000 - CODE_EPOCH_MS
+            if now > self.last_ms:
+                self.last_ms, self.sequence = now, 0
+            else:
+                # Same millisecond or the clock went back: keep counting from the last one
+                self.sequence += 1
+                if self.sequence >> SEQUENCE_BITS:
+                    self.last_ms, self.sequence = self.last_ms + 1, 0
+            return (self.last_ms << (NODE_BITS + SEQUENCE_BITS)) | (self.node << SEQUENCE_BITS) | self.sequence
+
+    def __call__(self) -> str:
+        value = self.next_value()
+        chars = []
+        for _ in range(CODE_LENGTH):
+            value, index = divmod(value, len(CODE_ALPHABET))
+            chars.append(CODE_ALPHABET[index])
+        return "".join(reversed(chars))
+
+
+_code_generator = CodeGenerator()
+
+
+def generate_unique_code() -> str:
+    """
+    Generate a unique, time ordered code for any model field, no database query needed.
 
     Returns:
-        str: A unique code.
+        str: A 12 character code, later codes sort after earlier ones.
     """
-    allowed_chars = "ABCDEFGHIJKLMNOPQRSTUVWXYZ123456789"
-    code = "".join(secrets.choice(allowed_chars) for _ in range(12))
-    similar_object_exists = model.objects.filter(**{field: code}).exists()
-    if not similar_object_exists:
-        return code
-    return generate_unique_code(model, field)
+    return _code_generator()
 
 
 class UpdateMixin:
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-18 05:58
+
+from django.db import migrations, models
+
+
+def snapshot_existing_orders(apps, schema_editor):
+    # Past orders have no recorded prices, the current ones are the best approximation
+    Order = apps.get_model('profiles', 'Order')
+    OrderItem = apps.get_model('profiles', 'OrderItem')
+    items = OrderItem.objects.filter(order__isnull=False).select_related('product')
+    subtotals = {}
+    for item in items.iterator(chunk_size=1000):
+        item.unit_price = item.product.price_current
+        item.line_total = item.unit_price * item.quantity
+        item.save(update_fields=['unit_price', 'line_total'])
+        subtotals[item.order_id] = subtotals.get(item.order_id, 0) + item.line_total
+    for order_id, subtotal in subtotals.items():
+        Order.objects.filter(pk=order_id).update(subtotal=subtotal, total=subtotal)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='line_total',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(snapshot_existing_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:42
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def split_existing_orders(apps, schema_editor):
+    # Same split as checkout, the sub-orders take the date and delivery status of their order
+    SellerOrder = apps.get_model('profiles', 'SellerOrder')
+    OrderItem = apps.get_model('profiles', 'OrderItem')
+    items = OrderItem.objects.filter(order__isnull=False, product__seller__isnull=False).\
+        select_related('order', 'product')
+    seller_orders, assigned = {}, []
+    for item in items.iterator(chunk_size=1000):
+        key = (item.order_id, item.product.seller_id)
+        if key not in seller_orders:
+            seller_orders[key] = SellerOrder(order_id=item.order_id, seller_id=item.product.seller_id,
+                                             delivery_status=item.order.delivery_status,
+                                             created_at=item.order.created_at)
+        seller_order = seller_orders[key]
+        seller_order.subtotal += item.line_total or 0
+        seller_order.item_count += item.quantity
+        item.seller_order = seller_order
+        assigned.append(item)
+    rows = list(seller_orders.values())
+    created_at = [row.created_at for row in rows]
+    SellerOrder.objects.bulk_create(rows, batch_size=1000)
+    # auto_now_add overwrote the dates on insert
+    for row, value in zip(rows, created_at):
+        row.created_at = value
+    SellerOrder.objects.bulk_update(rows, ['created_at'], batch_size=1000)
+    OrderItem.objects.bulk_update(assigned, ['seller_order'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0003_order_user_created_idx'),
+        ('sellers', '0002_alter_seller_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerOrder',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('delivery_status', models.CharField(choices=[('PENDING', 'PENDING'), ('PACKING', 'PACKING'), ('SHIPPING', 'SHIPPING'), ('ARRIVING', 'ARRIVING'), ('SUCCESS', 'SUCCESS')], default='PENDING', max_length=20)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seller_orders', to='profiles.order')),
+                ('seller', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='sellers.seller')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='seller_order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='profiles.sellerorder'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerorder',
+            index=models.Index(fields=['seller', '-created_at'], name='seller_order_seller_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='sellerorder',
+            constraint=models.UniqueConstraint(fields=('order', 'seller'), name='seller_order_order_seller_uniq'),
+        ),
+        migrations.RunPython(split_existing_orders, migrations.RunPython.noop),
+    ]
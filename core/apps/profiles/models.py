@@ -3,6 +3,7 @@ from django.db import models
 from ..common.models import BaseModel, IsDeletedModel
 from ..accounts.models import User
 from ..common.utils import generate_unique_code
+from ..sellers.models import Seller
 from ..shop.models import Product
 
 
@@ -55,37 +56,88 @@ class Order(BaseModel):
     country = models.CharField(max_length=100, null=True)
     zipcode = models.CharField(max_length=6, null=True)
 
-    @property
-    def get_cart_subtotal(self):
-        order_items = self.order_items.all()
-        subtotal = sum(item.get_total for item in order_items)
-        return subtotal
-
-    @property
-    def get_cart_total(self):
-        total = self.get_cart_subtotal
-        return total
+    # Totals are fixed at checkout from the items' purchase prices
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     def __str__(self):
         return f"{self.user.full_name}'s order"
 
     def save(self, *args, **kwargs) -> None:
         if not self.created_at:
-            self.tx_ref = generate_unique_code(Order, "tx_ref")
+            self.tx_ref = generate_unique_code()
         super().save(*args, **kwargs)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+        ]
+
+
+class SellerOrder(BaseModel):
+    """The part of an order a single seller fulfils, split off at checkout."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='seller_orders')
+    seller = models.ForeignKey(Seller, on_delete=models.SET_NULL, null=True, related_name='orders')
+    delivery_status = models.CharField(max_length=20, default="PENDING",
+                                       choices=DELIVERY_STATUS_CHOICES)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.order.tx_ref} for {self.seller}"
+
+    @classmethod
+    def split(cls, order, items):
+        """
+        Unsaved sub-orders of `order`, one per seller of the priced `items`, which
+        get their seller_order set. Items of products without a seller stay unassigned.
+        """
+        seller_orders = {}
+        for item in items:
+            seller_id = item.product.seller_id
+            if seller_id is None:
+                continue
+            if seller_id not in seller_orders:
+                seller_orders[seller_id] = cls(order=order, seller_id=seller_id)
+            seller_order = seller_orders[seller_id]
+            seller_order.subtotal += item.line_total
+            seller_order.item_count += item.quantity
+            item.seller_order = seller_order
+        return list(seller_orders.values())
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['seller', '-created_at'], name='seller_order_seller_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'seller'], name='seller_order_order_seller_uniq'),
+        ]
+
 
 class OrderItem(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True,
                               related_name='order_items')
+    seller_order = models.ForeignKey(SellerOrder, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='order_items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    # Price snapshot taken at checkout, empty while the item is in a cart
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
     @property
     def get_total(self):
+        if self.line_total is not None:
+            return self.line_total
         return self.product.price_current * self.quantity
 
+    def set_purchase_price(self, unit_price):
+        self.unit_price = unit_price
+        self.line_total = unit_price * self.quantity
+
     @property
     def get_in_stock(self):
         return self.product.in_stock
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from ..common.serializers import RenditionsField
 from ..common.utils import UpdateMixin
 
 
@@ -8,6 +9,7 @@ class ProfileSerializer(UpdateMixin, serializers.Serializer):
     last_name = serializers.CharField(max_length=50)
     email = serializers.EmailField(read_only=True)
     avatar = serializers.ImageField(required=False)
+    renditions = RenditionsField()
     account_type = serializers.CharField(read_only=True)
 
 
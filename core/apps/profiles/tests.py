@@ -1,3 +1,21 @@
 from django.test import TestCase
 
-# Create your tests here.
+from ..accounts.models import User
+from .models import Order
+
+
+class OrderReferenceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('Buyer', 'User', 'buyer@example.com', 'password')
+
+    def test_references_are_generated_in_order(self):
+        first, second = Order.objects.create(user=self.user), Order.objects.create(user=self.user)
+        self.assertEqual(len(first.tx_ref), 12)
+        self.assertLess(first.tx_ref, second.tx_ref)
+
+    def test_saving_again_keeps_reference(self):
+        order = Order.objects.create(user=self.user)
+        tx_ref = order.tx_ref
+        order.save()
+        order.refresh_from_db()
+        self.assertEqual(order.tx_ref, tx_ref)
@@ -1,6 +1,5 @@
 from django.shortcuts import render
 from rest_framework.views import APIView
-from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, extend_schema_view
 
@@ -9,14 +8,18 @@ from ..shop.serializers import OrderSerializer, CheckItemOrderSerializer, Review
 from .models import ShippingAddress, Order, OrderItem
 from ..shop.models import Review, Product
 from ..common.permissions import IsOwner
-from ..common.paginations import CustomNumberPagination
+from ..common.paginations import CustomCursorPagination
+from ..common.views import AsyncAPIView, AsyncListAPIView
+from ..common.timing import ServerTimingMixin
+from ..common.conditional import make_etag, not_modified, queryset_validators
+from ..common.fieldsets import FIELDSET_PARAMS, prune_queryset, requested_fieldset
 
 
 profile_tag = ['Profiles']
 profile_address = ['Profile Shipping Info']
 
 
-class ProfileView(APIView):
+class ProfileView(ServerTimingMixin, APIView):
     serializer_class = ProfileSerializer
     permission_classes = [IsOwner]
 
@@ -64,7 +67,7 @@ class ProfileView(APIView):
         return Response({'message': f'Account {user.email} deactivated'})
 
 
-class ShippingAddressView(APIView):
+class ShippingAddressView(ServerTimingMixin, APIView):
     serializer_class = ShippingAddressSerializer
     permission_classes = [IsOwner]
 
@@ -75,8 +78,12 @@ class ShippingAddressView(APIView):
     )
     def get(self, request, *args, **kwargs):
         shipping_addresses = ShippingAddress.objects.filter(user=request.user)
+        etag = make_etag(request, {'user': request.user.pk, **queryset_validators(shipping_addresses)})
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
         serializer = self.serializer_class(shipping_addresses, many=True)
-        return Response(data=serializer.data)
+        return Response(data=serializer.data, headers={'ETag': etag})
 
     @extend_schema(
         summary="Create Shipping Address",
@@ -93,7 +100,7 @@ class ShippingAddressView(APIView):
         return Response(data=serializer.data, status=status)
 
 
-class ShippingAddressDetailView(APIView):
+class ShippingAddressDetailView(ServerTimingMixin, APIView):
     serializer_class = ShippingAddressSerializer
     permission_classes = [IsOwner]
 
@@ -150,29 +157,34 @@ class ShippingAddressDetailView(APIView):
         return Response(data={"message": "Shipping address deleted successfully"}, status=200)
 
 
-class OrdersView(APIView):
+class OrdersView(ServerTimingMixin, AsyncAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsOwner]
+    pagination_class = CustomCursorPagination
 
     @extend_schema(
         operation_id="orders_view",
         summary="Orders Fetch",
         description="""This endpoint returns all orders for a particular user.""",
-        tags=profile_tag
+        tags=profile_tag,
+        parameters=FIELDSET_PARAMS,
     )
-    def get(self, request):
-        orders = Order.objects.select_related('user').filter(user=request.user)\
-            .prefetch_related("order_items__product").order_by("-created_at")
-        serializer = self.serializer_class(orders, many=True)
-        return Response(data=serializer.data, status=200)
+    async def get(self, request):
+        fieldset = requested_fieldset(request, self.serializer_class._declared_fields)
+        orders = prune_queryset(Order.objects.filter(user=request.user).order_by("-created_at"),
+                                self.serializer_class(**fieldset))
+        paginator = self.pagination_class()
+        p_orders = await paginator.apaginate_queryset(orders, request)
+        serializer = self.serializer_class(p_orders, many=True, **fieldset)
+        return paginator.get_paginated_response(serializer.data)
 
 
-class OrderItemsView(APIView):
+class OrderItemsView(ServerTimingMixin, AsyncAPIView):
     serializer_class = CheckItemOrderSerializer
     permission_classes = [IsOwner]
 
-    def get_object(self, **kwargs):
-        order = Order.objects.get_or_none(tx_ref=kwargs["tx_ref"])
+    async def aget_object(self, **kwargs):
+        order = await Order.objects.aget_or_none(tx_ref=kwargs["tx_ref"])
         if order:
             self.check_object_permissions(self.request, order)
         return order
@@ -183,13 +195,13 @@ class OrderItemsView(APIView):
         description="""This endpoint returns all items order for a particular user.""",
         tags=profile_tag,
     )
-    def get(self, request, *args, **kwargs):
-        order = self.get_object(**kwargs)
+    async def get(self, request, *args, **kwargs):
+        order = await self.aget_object(**kwargs)
         if not order:
             return Response(data={"message": "Order does not exist!"}, status=404)
         order_items = OrderItem.objects.filter(order=order).\
             select_related('product__seller__user', 'product__category')
-        serializer = self.serializer_class(order_items, many=True)
+        serializer = self.serializer_class([item async for item in order_items], many=True)
         return Response(data=serializer.data, status=200)
 
 
@@ -199,17 +211,22 @@ class OrderItemsView(APIView):
         summary="Fetch all your reviews",
         description="""This endpoint returns all your reviews.""",
         tags=profile_tag,
+        parameters=FIELDSET_PARAMS,
     )
 )
-class ReviewsListView(ListAPIView):
+class ReviewsListView(ServerTimingMixin, AsyncListAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [IsOwner]
-    pagination_class = CustomNumberPagination
+    pagination_class = CustomCursorPagination
 
-    def get(self, request, *args, **kwargs):
-        reviews = self.request.user.reviews.select_related('product')
+    async def get(self, request, *args, **kwargs):
+        fieldset = requested_fieldset(request, self.serializer_class._declared_fields, excluded=['full_name'])
+        reviews = prune_queryset(Review.objects.filter(user=request.user), self.serializer_class(**fieldset))
         # reviews = Review.objects.select_related('user', 'product').filter(user=request.user)
-        serializer = self.serializer_class(reviews, many=True, exclude_fields=['full_name'])
-        return Response(data={'full_name': request.user.full_name,
-                              'reviews': serializer.data}, status=200)
+        p_reviews = await self.apaginate_queryset(reviews)
+        # request.user comes with authorization fields only
+        await request.user.arefresh_from_db(fields=['first_name', 'last_name'])
+        serializer = self.serializer_class(p_reviews, many=True, **fieldset)
+        return self.get_paginated_response(data={'full_name': request.user.full_name,
+                                                 'reviews': serializer.data})
 
@@ -0,0 +1,190 @@
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from ..profiles.models import OrderItem, SellerOrder
+from ..shop.models import Product, Review
+from .models import ProductDailySales, SellerDailySales
+
+
+# Counters of SalesRollup, summed when rows are merged
+COUNTER_FIELDS = ('units_sold', 'revenue', 'order_count', 'rating_sum', 'reviews_count')
+
+# Checkouts started before midnight record sales of the day before after it
+REBUILD_MARGIN = timedelta(hours=1)
+
+
+def add_to_rollups(model, key_fields, rows):
+    """
+    Add the counters of `rows` to the rollup rows with the same `key_fields` in one
+    INSERT ... ON CONFLICT DO UPDATE, creating the missing ones. Rows are dicts of
+    field values, counters left out count as 0. Runs in the caller's transaction.
+    """
+    if not rows:
+        return
+    fields_by_name = {field.attname: field for field in model._meta.concrete_fields}
+    columns = [name for name in rows[0] if name not in COUNTER_FIELDS]
+    fields = [fields_by_name[name] for name in ('id', 'created_at', 'updated_at', *columns, *COUNTER_FIELDS)]
+    # Concurrent checkouts lock the rows they share in the same order
+    rows = sorted(rows, key=lambda row: tuple(str(row[name]) for name in key_fields))
+    now = timezone.now()
+    params = []
+    for row in rows:
+        values = {'id': uuid.uuid4(), 'created_at': now, 'updated_at': now,
+                  **dict.fromkeys(COUNTER_FIELDS, 0), **row}
+        params += [field.get_db_prep_save(values[field.attname], connection) for field in fields]
+
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    placeholders = '(%s)' % ', '.join(['%s'] * len(fields))
+    updates = [f'{qn(name)} = {table}.{qn(name)} + EXCLUDED.{qn(name)}' for name in COUNTER_FIELDS]
+    updates.append(f'{qn("updated_at")} = EXCLUDED.{qn("updated_at")}')
+    sql = (f'INSERT INTO {table} ({", ".join(qn(field.column) for field in fields)}) '
+           f'VALUES {", ".join([placeholders] * len(rows))} '
+           f'ON CONFLICT ({", ".join(qn(fields_by_name[name].column) for name in key_fields)}) '
+           f'DO UPDATE SET {", ".join(updates)}')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def record_checkout(seller_orders, items):
+    """Add saved sub-orders and their items to the rollups of the checkout day."""
+    if not seller_orders:
+        return
+    date = timezone.localdate(seller_orders[0].created_at)
+    add_to_rollups(SellerDailySales, ('seller_id', 'date'), [
+        {'seller_id': seller_order.seller_id, 'date': date, 'units_sold': seller_order.item_count,
+         'revenue': seller_order.subtotal, 'order_count': 1}
+        for seller_order in seller_orders
+    ])
+    add_to_rollups(ProductDailySales, ('product_id', 'date'), [
+        {'product_id': item.product_id, 'seller_id': item.seller_order.seller_id, 'date': date,
+         'units_sold': item.quantity, 'revenue': item.line_total, 'order_count': 1}
+        for item in items if item.seller_order is not None
+    ])
+
+
+def record_review_change(product, review, rating_delta, count_delta):
+    """
+    Shift the ratings of the day `review` was written, so a range always averages
+    the reviews written in it, edits included.
+    """
+    if product.seller_id is None:
+        return
+    date = timezone.localdate(review.created_at)
+    counters = {'rating_sum': rating_delta, 'reviews_count': count_delta}
+    add_to_rollups(SellerDailySales, ('seller_id', 'date'), [
+        {'seller_id': product.seller_id, 'date': date, **counters}
+    ])
+    add_to_rollups(ProductDailySales, ('product_id', 'date'), [
+        {'product_id': product.pk, 'seller_id': product.seller_id, 'date': date, **counters}
+    ])
+
+
+def rebuild_rollups(seller_ids, since=None, until=None):
+    """
+    Recalculate the rollups of the given sellers from their sub-orders and reviews,
+    replacing the rows of the days from `since` (the first one without it) to
+    `until`, exclusive. Returns the number of seller and product rows written.
+
+    By default `until` is the day REBUILD_MARGIN ago, later days stay with the
+    incremental path. Only checkouts in flight add to the days before, so their
+    sales are read without locks. Review changes add to the day the review was
+    written and lock the product first: every seller is then written in a short
+    transaction holding its products while reading their reviews and replacing
+    its rows. Pass a later `until` only when nothing else writes, like seeding.
+    """
+    if until is None:
+        until = timezone.localdate(timezone.now() - REBUILD_MARGIN)
+    seller_count = product_count = 0
+    for seller_id in seller_ids:
+        seller_rows, product_rows = collect_sales(seller_id, since, until)
+        with transaction.atomic():
+            list(Product.objects.unfiltered().filter(seller_id=seller_id).select_for_update().order_by('id').
+                 values_list('id', flat=True))
+            add_reviews(seller_rows, product_rows, seller_id, since, until)
+            for model in (SellerDailySales, ProductDailySales):
+                stale = model.objects.filter(seller_id=seller_id, date__lt=until)
+                if since is not None:
+                    stale = stale.filter(date__gte=since)
+                stale.delete()
+            SellerDailySales.objects.bulk_create([
+                SellerDailySales(seller_id=seller_id, date=date, **counters)
+                for (seller_id, date), counters in seller_rows.items()
+            ], batch_size=1000)
+            ProductDailySales.objects.bulk_create([
+                ProductDailySales(product_id=product_id, seller_id=seller_id, date=date, **counters)
+                for (product_id, seller_id, date), counters in product_rows.items()
+            ], batch_size=1000)
+        seller_count += len(seller_rows)
+        product_count += len(product_rows)
+    return seller_count, product_count
+
+
+def in_days(queryset, field, since, until):
+    queryset = queryset.filter(**{f'{field}__date__lt': until})
+    return queryset if since is None else queryset.filter(**{f'{field}__date__gte': since})
+
+
+def collect_sales(seller_id, since, until):
+    """Sales counters of the seller and product rollups of a seller, keyed like their unique constraints."""
+    sales = in_days(SellerOrder.objects.filter(seller_id=seller_id), 'created_at', since, until)
+    items = in_days(OrderItem.objects.filter(seller_order__seller_id=seller_id), 'seller_order__created_at',
+                    since, until)
+
+    seller_rows = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+    product_rows = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+    for row in sales.annotate(day=TruncDate('created_at')).values('seller_id', 'day').annotate(
+            units=Sum('item_count'), total=Sum('subtotal'), orders=Count('id')):
+        seller_rows[row['seller_id'], row['day']].update(
+            units_sold=row['units'], revenue=row['total'], order_count=row['orders'])
+    for row in items.annotate(day=TruncDate('seller_order__created_at'), seller_id=F('seller_order__seller_id')).\
+            values('product_id', 'seller_id', 'day').annotate(
+            units=Sum('quantity'), total=Sum('line_total'), orders=Count('order_id', distinct=True)):
+        product_rows[row['product_id'], row['seller_id'], row['day']].update(
+            units_sold=row['units'], revenue=row['total'] or 0, order_count=row['orders'])
+    return seller_rows, product_rows
+
+
+def add_reviews(seller_rows, product_rows, seller_id, since, until):
+    """Add the rating counters of the reviews of a seller's products to rows from collect_sales()."""
+    reviews = in_days(Review.objects.filter(product__seller_id=seller_id), 'created_at', since, until)
+    for row in reviews.annotate(day=TruncDate('created_at'), seller_id=F('product__seller_id')).\
+            values('product_id', 'seller_id', 'day').annotate(
+            ratings=Coalesce(Sum('rating'), 0), count=Count('id')):
+        for counters in (seller_rows[row['seller_id'], row['day']],
+                         product_rows[row['product_id'], row['seller_id'], row['day']]):
+            counters['rating_sum'] += row['ratings']
+            counters['reviews_count'] += row['count']
+
+
+def with_rating(counters):
+    counters['rating_avg'] = Product.calculate_rating(counters.pop('rating_sum'), counters['reviews_count'])
+    return counters
+
+
+def sales_report(seller_id, date_from, date_to, top=10):
+    """Daily sales of a seller between two dates (inclusive), their totals and the top products by revenue."""
+    period = {'seller_id': seller_id, 'date__range': (date_from, date_to)}
+    days = list(SellerDailySales.objects.filter(**period).order_by('date').values('date', *COUNTER_FIELDS))
+    totals = {name: sum(day[name] for day in days) for name in COUNTER_FIELDS}
+    # Annotations can't reuse the names of the summed fields
+    products = ProductDailySales.objects.filter(**period).values('product_id').annotate(
+        slug=F('product__slug'), name=F('product__name'), **{f'total_{name}': Sum(name) for name in COUNTER_FIELDS}
+    ).order_by('-total_revenue', 'product_id')[:top]
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'totals': with_rating(totals),
+        'days': [with_rating(day) for day in days],
+        'products': [
+            with_rating({'slug': row['slug'], 'name': row['name'],
+                         **{name: row[f'total_{name}'] for name in COUNTER_FIELDS}})
+            for row in products
+        ],
+    }
@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from ...analytics import rebuild_rollups
+from ...models import Seller
+
+
+def rebuild_chunk(seller_ids, since):
+    try:
+        return rebuild_rollups(seller_ids, since)
+    finally:
+        # Every worker thread opened its own connection
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = ("Recalculate the daily sales rollups of sellers from their orders and reviews, one seller per "
+            "transaction. Today's rows are left to checkouts and review changes")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help="First day to recalculate (YYYY-MM-DD), the whole history by default")
+        parser.add_argument('--chunk-size', type=int, default=100, help="Sellers per worker task")
+        parser.add_argument('--workers', type=int, default=4, help="Chunks recalculated in parallel")
+
+    def handle(self, *args, **options):
+        seller_ids = list(Seller.objects.order_by('pk').values_list('pk', flat=True))
+        size = options['chunk_size']
+        # Chunks cover disjoint sellers, so they never write the same rows
+        chunks = [seller_ids[i:i + size] for i in range(0, len(seller_ids), size)]
+        since = [options['since']] * len(chunks)
+        seller_rows = product_rows = 0
+        if options['workers'] > 1:
+            executor = ThreadPoolExecutor(max_workers=options['workers'])
+            results = executor.map(rebuild_chunk, chunks, since)
+        else:
+            executor, results = None, map(rebuild_rollups, chunks, since)
+        try:
+            for i, (sellers, products) in enumerate(results, 1):
+                seller_rows += sellers
+                product_rows += products
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"Rebuilt chunk {i} of {len(chunks)}")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {seller_rows} seller and {product_rows} product rollup rows for {len(seller_ids)} sellers"))
@@ -27,4 +27,39 @@ class Seller(BaseModel):
     is_approved = models.BooleanField(default=False)
 
     def __str__(self):
-        return f"Seller for {self.business_name}"
\ No newline at end of file
+        return f"Seller for {self.business_name}"
+
+class SalesRollup(BaseModel):
+    """Counters of one day, maintained by analytics.py."""
+    date = models.DateField()
+    units_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+    # Reviews written that day, as they read now
+    rating_sum = models.IntegerField(default=0)
+    reviews_count = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class SellerDailySales(SalesRollup):
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='daily_sales')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'date'], name='seller_daily_sales_uniq'),
+        ]
+
+
+class ProductDailySales(SalesRollup):
+    product = models.ForeignKey('shop.Product', on_delete=models.CASCADE, related_name='daily_sales')
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='product_daily_sales')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='product_daily_sales_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['seller', 'date'], name='product_daily_seller_idx'),
+        ]
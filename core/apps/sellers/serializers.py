@@ -1,3 +1,6 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
 
 from ..common.utils import UpdateMixin
@@ -20,4 +23,47 @@ class SellerSerializer(UpdateMixin, serializers.Serializer):
     bank_account_number = serializers.CharField(max_length=50)
     bank_routing_number = serializers.CharField(max_length=50)
 
-    is_approved = serializers.BooleanField(read_only=True)
\ No newline at end of file
+    is_approved = serializers.BooleanField(read_only=True)
+
+
+class SalesSerializer(serializers.Serializer):
+    units_sold = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    order_count = serializers.IntegerField()
+    reviews_count = serializers.IntegerField()
+    rating_avg = serializers.DecimalField(max_digits=3, decimal_places=2, allow_null=True)
+
+
+class DailySalesSerializer(SalesSerializer):
+    date = serializers.DateField()
+
+
+class ProductSalesSerializer(SalesSerializer):
+    slug = serializers.CharField()
+    name = serializers.CharField()
+
+
+class SalesReportSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    totals = SalesSerializer()
+    days = DailySalesSerializer(many=True)
+    products = ProductSalesSerializer(many=True)
+
+
+class SalesReportQuerySerializer(serializers.Serializer):
+    MAX_DAYS = 366
+
+    date_from = serializers.DateField(required=False, help_text="First day of the report, 30 days ago by default")
+    date_to = serializers.DateField(required=False, help_text="Last day of the report, today by default")
+    top = serializers.IntegerField(required=False, default=10, min_value=0, max_value=100,
+                                   help_text="How many products with the highest revenue to list")
+
+    def validate(self, attrs):
+        attrs.setdefault('date_to', timezone.localdate())
+        attrs.setdefault('date_from', attrs['date_to'] - timedelta(days=29))
+        if attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from can't be after date_to")
+        if (attrs['date_to'] - attrs['date_from']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f"A report covers at most {self.MAX_DAYS} days")
+        return attrs
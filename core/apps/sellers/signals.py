@@ -0,0 +1,9 @@
+from django.dispatch import receiver
+
+from ..shop.models import Product, review_changed
+from .analytics import record_review_change
+
+
+@receiver(review_changed, sender=Product)
+def record_review_in_rollups(sender, product, review, rating_delta, count_delta, **kwargs):
+    record_review_change(product, review, rating_delta, count_delta)
@@ -1,3 +1,67 @@
+from datetime import timedelta
+
+from django.db.models import F
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..accounts.models import User
+from ..profiles.models import Order, SellerOrder, ShippingAddress
+from ..shop.cart import get_cart_store
+from ..shop.tests import make_catalog
+from .analytics import rebuild_rollups
+from .models import ProductDailySales, SellerDailySales
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        get_cart_store.cache_clear()
+        self.products = make_catalog()
+        self.seller = self.products[0].seller
+        self.buyer = User.objects.create_user('Buyer', 'User', 'buyer@example.com', 'password')
+        self.address = ShippingAddress.objects.create(user=self.buyer, full_name='Buyer', email='buyer@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def tearDown(self):
+        get_cart_store.cache_clear()
+
+    def checkout(self, quantities):
+        get_cart_store().update(self.buyer.id, {product.id: quantity for product, quantity in quantities})
+        # The cart is emptied once the checkout commits
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/shop/checkout/', {'shipping_id': str(self.address.id)}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+    @staticmethod
+    def rollups():
+        fields = ('date', 'units_sold', 'revenue', 'order_count', 'rating_sum', 'reviews_count')
+        return (list(SellerDailySales.objects.order_by('seller_id', 'date').values('seller_id', *fields)),
+                list(ProductDailySales.objects.order_by('product_id', 'date').values('product_id', *fields)))
+
+    @staticmethod
+    def backdate(days):
+        """Move everything recorded so far `days` back, out of the days rebuilds leave alone."""
+        for model in (Order, SellerOrder):
+            model.objects.update(created_at=F('created_at') - timedelta(days=days))
+        for model in (SellerDailySales, ProductDailySales):
+            model.objects.update(date=F('date') - timedelta(days=days))
+
+    def test_rebuild_matches_recorded_checkouts(self):
+        self.checkout([(self.products[0], 2), (self.products[1], 1)])
+        self.checkout([(self.products[0], 1)])
+        self.backdate(2)
+        recorded = self.rollups()
+        self.assertEqual(recorded[0][0]['units_sold'], 4)
+        SellerDailySales.objects.update(units_sold=0)
+        self.assertEqual(rebuild_rollups([self.seller.id]), (1, 2))
+        self.assertEqual(self.rollups(), recorded)
 
-# Create your tests here.
+    def test_rebuild_leaves_today_to_checkouts(self):
+        self.checkout([(self.products[0], 1)])
+        self.backdate(2)
+        self.checkout([(self.products[0], 2)])
+        self.assertEqual(rebuild_rollups([self.seller.id]), (1, 1))
+        self.checkout([(self.products[0], 1)])
+        sellers, products = self.rollups()
+        self.assertEqual([(row['units_sold'], row['order_count']) for row in sellers], [(1, 1), (3, 2)])
+        self.assertEqual([row['units_sold'] for row in products], [1, 3])
@@ -1,13 +1,15 @@
 from django.urls import path
 
-from .views import SellerView, SellerProductsView, SellerProductView, \
-    SellerOrdersView, SellerOrderItemsView
+from .views import SellerView, SellerProductsView, SellerProductsBulkView, SellerProductView, \
+    SellerOrdersView, SellerOrderItemsView, SellerAnalyticsView
 
 
 urlpatterns = [
     path('', SellerView.as_view(), name='seller'),
     path('products/', SellerProductsView.as_view(), name='sellers_products'),
+    path('products/bulk/', SellerProductsBulkView.as_view(), name='sellers_products_bulk'),
     path('products/<slug:slug>', SellerProductView.as_view(), name='sellers_products'),
     path('orders/', SellerOrdersView.as_view({'get': 'list'})),
-    path('orders/<str:tx_ref>', SellerOrderItemsView.as_view())
+    path('orders/<str:tx_ref>', SellerOrderItemsView.as_view()),
+    path('analytics/', SellerAnalyticsView.as_view(), name='sellers_analytics'),
 ]
\ No newline at end of file
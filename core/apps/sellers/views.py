@@ -1,17 +1,24 @@
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, extend_schema_view
 
 from .models import Seller
-from ..shop.models import Product, Category
-from ..profiles.models import Order
-from .serializers import SellerSerializer
+from ..shop.models import Product
+from ..profiles.models import OrderItem, SellerOrder
+from .analytics import sales_report
+from .serializers import SalesReportQuerySerializer, SalesReportSerializer, SellerSerializer
 from ..shop import serializers as shop_serializers
+from ..shop.categories import get_category
+from ..shop.bulk import FILE_FORMATS, export_rows, guess_file_format, import_products, read_rows
 from ..shop.filters import ProductFilter
 from ..common.permissions import IsSeller
 from ..common.paginations import CustomNumberPagination
-from ..shop.schema_examples import PRODUCT_PARAMS
+from ..common.fieldsets import FIELDSET_PARAMS, FieldsetMixin, requested_fieldset
+from ..common.timing import ServerTimingMixin
+from ..shop.schema_examples import PRODUCT_PARAMS, BULK_EXPORT_PARAMS
 
 
 seller_tag = ['Sellers']
@@ -21,12 +28,13 @@ seller_doesnt_exist_message = {
 }
 
 
-class SellerView(APIView):
+class SellerView(ServerTimingMixin, APIView):
     serializer_class = SellerSerializer
 
     def get_object(self, request):
-        seller = Seller.objects.get_or_none(user=request.user)
-        return seller
+        if not request.user.seller_id:
+            return None
+        return Seller.objects.get_or_none(pk=request.user.seller_id)
 
     @extend_schema(
         summary="Apply to become a seller",
@@ -62,7 +70,7 @@ class SellerView(APIView):
         tags=seller_tag
     )
     def patch(self, request):
-        seller = self.get_object(request.user)
+        seller = self.get_object(request)
         if not seller:
             return Response(seller_doesnt_exist_message)
         serializer = self.serializer_class(seller, request.data, partial=True)
@@ -71,7 +79,7 @@ class SellerView(APIView):
         return Response(data=serializer.data)
 
 
-class SellerProductsView(APIView):
+class SellerProductsView(ServerTimingMixin, APIView):
     serializer_class = shop_serializers.ProductSerializer
     permission_classes = [IsSeller]
     filterset_class = ProductFilter
@@ -85,14 +93,14 @@ class SellerProductsView(APIView):
         parameters=PRODUCT_PARAMS,
     )
     def get(self, request):
-        seller = Seller.objects.get_or_none(user=request.user)
-        products = Product.objects.select_related('category', 'seller__user').filter(seller=seller)
+        fieldset = requested_fieldset(request, self.serializer_class._declared_fields)
+        products = Product.objects.filter(seller_id=request.user.seller_id)
         filter_set = self.filterset_class(data=request.query_params, queryset=products)
         if filter_set.is_valid():
-            f_products = filter_set.qs
+            f_products = shop_serializers.ProductListSerializer.project(filter_set.qs, **fieldset)
             paginator = self.pagination_class()
             pf_products = paginator.paginate_queryset(f_products, request)
-            serializer = self.serializer_class(instance=pf_products, many=True)
+            serializer = shop_serializers.ProductListSerializer(instance=pf_products, many=True, **fieldset)
             return paginator.get_paginated_response(serializer.data)
         return Response(data=filter_set.errors, status=400)
 
@@ -104,22 +112,67 @@ class SellerProductsView(APIView):
         responses=shop_serializers.CreateProductSerializer,
     )
     def post(self, request):
-        seller = Seller.objects.get_or_none(user=request.user, is_approved=True)
-        if not seller:
+        if not (request.user.seller_id and request.user.seller_approved):
             return Response(data={"message": "Access is denied"}, status=403)
         data_serializer = shop_serializers.CreateProductSerializer(data=request.data)
         data_serializer.is_valid(raise_exception=True)
         data = data_serializer.validated_data
         category_slug = data.pop('category_slug', None)
-        category = Category.objects.get_or_none(slug=category_slug)
+        category = get_category(category_slug)
         if not category:
             return Response(data={"message": "Category does not exist!"}, status=404)
-        product = Product.objects.create(seller=seller, category=category, **data)
+        product = Product.objects.create(seller_id=request.user.seller_id, category_id=category.id, **data)
         serializer = self.serializer_class(instance=product)
         return Response(data=serializer.data, status=201)
 
 
-class SellerProductView(APIView):
+class SellerProductsBulkView(ServerTimingMixin, APIView):
+    permission_classes = [IsSeller]
+    parser_classes = [MultiPartParser]
+
+    @extend_schema(
+        summary="Export seller's products",
+        description="""This endpoint streams all products of a seller as CSV or NDJSON,
+                        in the same format accepted by the bulk import.""",
+        tags=seller_tag,
+        parameters=BULK_EXPORT_PARAMS,
+    )
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in FILE_FORMATS:
+            return Response(data={"message": f"Choose file_format from: {', '.join(FILE_FORMATS)}"}, status=400)
+        products = Product.objects.filter(seller_id=request.user.seller_id)
+        response = StreamingHttpResponse(export_rows(products, file_format), content_type=FILE_FORMATS[file_format])
+        response['Content-Disposition'] = f'attachment; filename="products.{file_format}"'
+        return response
+
+    @extend_schema(
+        summary="Import products",
+        description="""This endpoint allows a seller to create many products from a CSV or NDJSON `file`.
+                        Columns are the fields of product creation, images are paths of already uploaded files.
+                        Products are only created when every row is valid, else the response lists
+                        errors of the rejected rows.""",
+        tags=seller_tag,
+        request={'multipart/form-data': {'type': 'object', 'properties': {
+            'file': {'type': 'string', 'format': 'binary'},
+            'file_format': {'type': 'string', 'enum': list(FILE_FORMATS)},
+        }}},
+    )
+    def post(self, request):
+        seller = Seller.objects.get_or_none(pk=request.user.seller_id, is_approved=True)
+        if not seller:
+            return Response(data={"message": "Access is denied"}, status=403)
+        file = request.FILES.get('file')
+        if not file:
+            return Response(data={"message": "No file uploaded"}, status=400)
+        file_format = request.data.get('file_format') or guess_file_format(file.name)
+        if file_format not in FILE_FORMATS:
+            return Response(data={"message": f"Choose file_format from: {', '.join(FILE_FORMATS)}"}, status=400)
+        report = import_products(seller, read_rows(file, file_format))
+        return Response(data=report, status=201 if report['created'] else 400)
+
+
+class SellerProductView(ServerTimingMixin, APIView):
     serializer_class = shop_serializers.CreateProductSerializer
     permission_classes = [IsSeller]
 
@@ -144,8 +197,7 @@ class SellerProductView(APIView):
         serializer = self.serializer_class(instance=product, data=request.data)
         serializer.is_valid(raise_exception=True)
         category_slug = serializer.validated_data.get('category_slug', None)
-        category = Category.objects.get_or_none(slug=category_slug)
-        if not category:
+        if not get_category(category_slug):
             return Response(data={"message": "Category does not exist!"}, status=404)
         serializer.save()
         if serializer.data['price_current'] != old_price:
@@ -170,21 +222,23 @@ class SellerProductView(APIView):
     list=extend_schema(
         operation_id="seller_orders_view",
         summary="Orders with Seller's products Fetch",
-        description="""This endpoint returns all orders contains seller's products.""",
+        description="""This endpoint returns the seller's part of every order containing seller's products:
+                        its own subtotal, item count and delivery status.""",
         tags=seller_tag,
+        parameters=FIELDSET_PARAMS,
     )
 )
-class SellerOrdersView(ModelViewSet):
-    serializer_class = shop_serializers.OrderSerializer
+class SellerOrdersView(ServerTimingMixin, FieldsetMixin, ModelViewSet):
+    serializer_class = shop_serializers.SellerOrderSerializer
     permission_classes = [IsSeller]
 
     def get_queryset(self):
-        qs = Order.objects.select_related('user').prefetch_related('order_items__product__seller').\
-            filter(order_items__product__seller=self.request.user.seller).distinct()
-        return qs
+        # Sub-orders are split off at checkout, the seller's index covers filter and ordering
+        # Joins are added by FieldsetMixin for the fields asked for
+        return SellerOrder.objects.filter(seller_id=self.request.user.seller_id).order_by('-created_at')
 
 
-class SellerOrderItemsView(APIView):
+class SellerOrderItemsView(ServerTimingMixin, APIView):
     serializer_class = shop_serializers.CheckItemOrderSerializer
     permission_classes = [IsSeller]
 
@@ -195,13 +249,30 @@ class SellerOrderItemsView(APIView):
         tags=seller_tag,
     )
     def get(self, request, *args, **kwargs):
-        order = Order.objects.get_or_none(tx_ref=kwargs['tx_ref'])
-        if not order:
+        seller_items = list(
+            OrderItem.objects.select_related('product__seller__user', 'product__category').
+            filter(seller_order__order__tx_ref=kwargs['tx_ref'], seller_order__seller_id=request.user.seller_id)
+        )
+        if not seller_items:
             return Response(data={"message": "Order does not exist!"}, status=404)
-        seller = request.user
-        seller_items = order.order_items.select_related('product__seller__user', 'product__category').\
-            filter(product__seller__user=seller)
         serializer = self.serializer_class(seller_items, many=True)
         return Response(data=serializer.data, status=200)
 
 
+class SellerAnalyticsView(ServerTimingMixin, APIView):
+    serializer_class = SalesReportSerializer
+    permission_classes = [IsSeller]
+
+    @extend_schema(
+        summary="Seller Sales Analytics",
+        description="""This endpoint returns units sold, revenue, order count and average rating of a seller
+                        per day and in total for a date range, with the products that earned the most.
+                        It reads daily rollups updated at checkout and on every review change.""",
+        tags=seller_tag,
+        parameters=[SalesReportQuerySerializer],
+    )
+    def get(self, request):
+        params = SalesReportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        report = sales_report(request.user.seller_id, **params.validated_data)
+        return Response(data=self.serializer_class(report).data)
@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+import os
+
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+
+from ..common.cache import invalidate
+from ..common.fields import reserve_unique_slugs
+from ..common.images import schedule_renditions
+from ..common.streaming import dumps
+from .cache import PRODUCTS_SCOPE, category_scope, invalidate_product_renditions, seller_scope
+from .categories import get_categories
+from .models import Product
+from .serializers import BulkProductSerializer
+
+
+FILE_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Columns of an export, in the shape accepted back by an import
+EXPORT_COLUMNS = {
+    'slug': 'slug',
+    'name': 'name',
+    'description': 'description',
+    'price_current': 'price_current',
+    'category_slug': 'category__slug',
+    'in_stock': 'in_stock',
+    'image1': 'image1',
+    'image2': 'image2',
+    'image3': 'image3',
+}
+
+
+def guess_file_format(filename):
+    extension = os.path.splitext(filename or '')[1].lstrip('.').lower()
+    return {'jsonl': 'ndjson', 'json': 'ndjson'}.get(extension, extension)
+
+
+def read_rows(file, file_format):
+    """Yield the rows of a binary CSV or NDJSON file one by one, None for unparsable lines."""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        yield from csv.DictReader(text)
+        return
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def import_products(seller, rows, chunk_size=500):
+    """
+    Validate and insert product rows in chunks with bulk_create, all or nothing.
+
+    Returns a report with the number of created products and the errors of every
+    rejected row, rows are numbered from 1. Every row is validated, but when any
+    is rejected the whole import is rolled back and nothing is created.
+    """
+    categories = {slug: category.id for slug, category in get_categories().by_slug.items()}
+    report = {'created': 0, 'errors': []}
+    touched_categories = set()
+    with transaction.atomic():
+        chunk = []
+        for number, row in enumerate(rows, start=1):
+            chunk.append((number, row))
+            if len(chunk) >= chunk_size:
+                touched_categories |= create_chunk(seller, chunk, categories, report)
+                chunk = []
+        if chunk:
+            touched_categories |= create_chunk(seller, chunk, categories, report)
+        if report['errors']:
+            # Renditions scheduled for the created rows are dropped along with them
+            transaction.set_rollback(True)
+            report['created'] = 0
+            return report
+        if report['created']:
+            category_slugs = {slug for slug, pk in categories.items() if pk in touched_categories}
+            invalidate(PRODUCTS_SCOPE, seller_scope(seller.slug), *map(category_scope, category_slugs))
+    return report
+
+
+def create_chunk(seller, chunk, categories, report):
+    serializer = BulkProductSerializer()
+    numbers, products = [], []
+    for number, row in chunk:
+        if row is None:
+            report['errors'].append({'row': number, 'errors': {'non_field_errors': ['Invalid JSON']}})
+            continue
+        try:
+            data = serializer.run_validation(row)
+        except ValidationError as exc:
+            report['errors'].append({'row': number, 'errors': exc.detail})
+            continue
+        category_id = categories.get(data.pop('category_slug'))
+        if not category_id:
+            report['errors'].append({'row': number, 'errors': {'category_slug': ['Category does not exist!']}})
+            continue
+        numbers.append(number)
+        products.append(Product(seller=seller, category_id=category_id, **data))
+    if report['errors']:
+        # The import is rolled back anyway, only the remaining rows need validating
+        return set()
+    reserve_unique_slugs(products)
+    try:
+        with transaction.atomic():
+            Product.objects.bulk_create(products)
+    except IntegrityError as exc:
+        # Most likely a slug taken concurrently
+        report['errors'].extend({'row': number, 'errors': {'non_field_errors': [str(exc)]}} for number in numbers)
+        return set()
+    for product in products:
+        schedule_renditions(Product, product.pk, [name for name in Product.IMAGE_FIELDS if getattr(product, name)],
+                            invalidate_product_renditions)
+    report['created'] += len(products)
+    return {product.category_id for product in products}
+
+
+class Echo:
+    """File-like object that returns what is written, used to format CSV lines."""
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, file_format, chunk_size=500):
+    """Yield the products of a queryset as CSV or NDJSON text in the import format, a chunk at a time."""
+    columns = list(EXPORT_COLUMNS)
+    rows = queryset.order_by('created_at', 'id').values_list(*EXPORT_COLUMNS.values()).iterator(chunk_size=chunk_size)
+    if file_format == 'csv':
+        writer = csv.writer(Echo())
+        format_row = writer.writerow
+        yield writer.writerow(columns)
+    else:
+        def format_row(row):
+            data = dict(zip(columns, row))
+            data['price_current'] = str(data['price_current'])
+            return dumps(data) + '\n'
+    lines = []
+    for row in rows:
+        lines.append(format_row(row))
+        if len(lines) >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
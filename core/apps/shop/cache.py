@@ -0,0 +1,43 @@
+from ..common.cache import invalidate
+from .models import Product
+
+
+# Bumped by bulk writes that don't send model signals
+CATALOG_SCOPE = 'catalog'
+PRODUCTS_SCOPE = 'products'
+CATEGORIES_SCOPE = 'categories'
+SELLERS_SCOPE = 'sellers'
+
+
+def product_scope(slug):
+    return f'product:{slug}'
+
+
+def category_scope(slug):
+    return f'category:{slug}'
+
+
+def seller_scope(slug):
+    return f'seller:{slug}'
+
+
+def product_scopes(product_ids):
+    """Scopes of every cached page that shows one of the given products."""
+    rows = Product.objects.unfiltered().filter(pk__in=product_ids).values_list(
+        'slug', 'category__slug', 'seller__slug')
+    scopes = {PRODUCTS_SCOPE}
+    for slug, category_slug, seller_slug in rows:
+        scopes.update((product_scope(slug), category_scope(category_slug), seller_scope(seller_slug)))
+    return scopes
+
+
+def invalidate_products(product_ids):
+    invalidate(*product_scopes(product_ids))
+
+
+def invalidate_product_renditions(product_id):
+    invalidate_products([product_id])
+
+
+def invalidate_catalog():
+    invalidate(CATALOG_SCOPE)
@@ -0,0 +1,142 @@
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from ..profiles.models import OrderItem
+from .models import Product
+
+
+class BaseCartStore:
+    """
+    Keeps the cart of every user as a hash of product id -> quantity. Carts only
+    become OrderItem rows at checkout. `shared` stores keep carts outside the
+    process, where every worker sees the same ones and they survive restarts.
+    """
+    shared = False
+
+    def get(self, user_id) -> dict:
+        """Return the cart as {product_id: quantity}, product ids as strings."""
+        raise NotImplementedError
+
+    def set(self, user_id, product_id, quantity) -> bool:
+        """Set the quantity of a line, 0 removes it. Return True if the line is new."""
+        raise NotImplementedError
+
+    def update(self, user_id, quantities: dict) -> set:
+        """Set several lines at once, 0 removes a line. Return ids of the lines that are new."""
+        raise NotImplementedError
+
+    def remove(self, user_id, product_ids) -> None:
+        raise NotImplementedError
+
+    def clear(self, user_id) -> None:
+        raise NotImplementedError
+
+
+class MemoryCartStore(BaseCartStore):
+    """Per-process store for development and tests, carts are lost on restart."""
+
+    def __init__(self, **options):
+        self.carts = {}
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            return dict(self.carts.get(str(user_id), {}))
+
+    def set(self, user_id, product_id, quantity):
+        return bool(self.update(user_id, {product_id: quantity}))
+
+    def update(self, user_id, quantities):
+        with self.lock:
+            cart = self.carts.setdefault(str(user_id), {})
+            added = {str(pk) for pk in quantities if str(pk) not in cart}
+            for pk, quantity in quantities.items():
+                if quantity:
+                    cart[str(pk)] = quantity
+                else:
+                    cart.pop(str(pk), None)
+            return added
+
+    def remove(self, user_id, product_ids):
+        self.update(user_id, dict.fromkeys(product_ids, 0))
+
+    def clear(self, user_id):
+        with self.lock:
+            self.carts.pop(str(user_id), None)
+
+
+class RedisCartStore(BaseCartStore):
+    """
+    One Redis hash per user. Carts expire `timeout` seconds after their last
+    change, so abandoned carts clean themselves up.
+    """
+    shared = True
+
+    def __init__(self, url=None, timeout=60 * 60 * 24 * 30, key_prefix='cart'):
+        import redis
+
+        self.client = redis.Redis.from_url(url or settings.REDIS_URL)
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    def key(self, user_id):
+        return f'{self.key_prefix}:{user_id}'
+
+    def get(self, user_id):
+        return {pk.decode(): int(quantity) for pk, quantity in self.client.hgetall(self.key(user_id)).items()}
+
+    def set(self, user_id, product_id, quantity):
+        return bool(self.update(user_id, {product_id: quantity}))
+
+    def update(self, user_id, quantities):
+        key = self.key(user_id)
+        product_ids = [str(pk) for pk in quantities]
+        with self.client.pipeline() as pipe:
+            # HMGET and the writes run in one MULTI block, so "new" is decided atomically
+            pipe.hmget(key, product_ids)
+            added = {str(pk): quantity for pk, quantity in quantities.items() if quantity}
+            removed = [str(pk) for pk, quantity in quantities.items() if not quantity]
+            if added:
+                pipe.hset(key, mapping=added)
+            if removed:
+                pipe.hdel(key, *removed)
+            pipe.expire(key, self.timeout)
+            current = pipe.execute()[0]
+        return {pk for pk, quantity in zip(product_ids, current) if quantity is None}
+
+    def remove(self, user_id, product_ids):
+        if product_ids:
+            self.client.hdel(self.key(user_id), *map(str, product_ids))
+
+    def clear(self, user_id):
+        self.client.delete(self.key(user_id))
+
+
+@lru_cache(maxsize=None)
+def get_cart_store() -> BaseCartStore:
+    return import_string(settings.CART_BACKEND)(**getattr(settings, 'CART_OPTIONS', {}))
+
+
+def cart_items(user, cart=None, for_update=False):
+    """
+    Build unsaved OrderItem instances from the cart of a user, in the shape the
+    views used to read from the database. Lines of products that no longer exist
+    are dropped from the cart.
+    """
+    store = get_cart_store()
+    cart = store.get(user.id) if cart is None else cart
+    if not cart:
+        return []
+    products = Product.objects.unfiltered().filter(id__in=cart)
+    if for_update:
+        # Lock the products in primary key order, so concurrent checkouts of the same items can't deadlock
+        products = products.select_for_update().order_by('id')
+    else:
+        products = products.select_related('seller__user')
+    items = [OrderItem(user=user, product=product, quantity=cart[str(product.id)]) for product in products]
+    if len(items) != len(cart):
+        store.remove(user.id, set(cart) - {str(item.product_id) for item in items})
+    return items
@@ -0,0 +1,122 @@
+import threading
+import uuid
+from types import MappingProxyType
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from ..common.cache import aget_versions, get_versions
+from ..common.serializers import rendition_urls
+from .cache import CATALOG_SCOPE, CATEGORIES_SCOPE
+from .models import Category
+
+
+# Category saves and deletes bump CATEGORIES_SCOPE, new renditions of their images CATALOG_SCOPE
+SNAPSHOT_SCOPES = [CATALOG_SCOPE, CATEGORIES_SCOPE]
+
+
+class CategoryEntry(NamedTuple):
+    id: uuid.UUID
+    name: str
+    slug: str
+    image_url: str | None
+    # {'<image field>': {'<size>': {'<format>': url}}}, urls relative like image_url
+    rendition_urls: MappingProxyType
+
+    def to_representation(self, request=None) -> dict:
+        """Same as CategorySerializer's, urls are absolute when there's a request."""
+        absolute = request.build_absolute_uri if request is not None else str
+        return {
+            'name': self.name,
+            'slug': self.slug,
+            'image': absolute(self.image_url) if self.image_url else None,
+            'renditions': {field_name: {size: {extension: absolute(url) for extension, url in urls.items()}
+                                        for size, urls in sizes.items()}
+                           for field_name, sizes in self.rendition_urls.items()},
+        }
+
+
+class CategorySnapshot(NamedTuple):
+    versions: dict
+    # In creation order
+    categories: tuple
+    by_slug: MappingProxyType
+
+    def get(self, slug) -> CategoryEntry | None:
+        return self.by_slug.get(slug)
+
+
+def load_snapshot(versions) -> CategorySnapshot:
+    storage = Category._meta.get_field('image').storage
+    categories = tuple(
+        CategoryEntry(pk, name, slug, storage.url(image) if image else None,
+                      MappingProxyType(rendition_urls(renditions or {})))
+        for pk, name, slug, image, renditions in Category.objects.order_by('created_at', 'id').values_list(
+            'id', 'name', 'slug', 'image', 'renditions')
+    )
+    return CategorySnapshot(versions, categories, MappingProxyType({entry.slug: entry for entry in categories}))
+
+
+class CategoryCatalog:
+    """
+    Per-process snapshot of all categories, so resolving a category slug or
+    listing categories needs no query.
+
+    The snapshot is read again, as a whole, by the first lookup that sees newer
+    versions of SNAPSHOT_SCOPES than the ones it was loaded at. Snapshots read
+    inside a transaction aren't kept, its rows may be rolled back or not visible
+    to other processes yet, and without a cache keeping versions (dummy backend)
+    every lookup reads the table.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+
+    def current(self, versions) -> CategorySnapshot | None:
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.versions == versions:
+            return snapshot
+        return None
+
+    def load(self, versions) -> CategorySnapshot:
+        with self.lock:
+            snapshot = self.current(versions)
+            if snapshot is not None:
+                return snapshot
+            snapshot = load_snapshot(versions)
+            if None not in versions.values() and not transaction.get_connection().in_atomic_block:
+                self.snapshot = snapshot
+            return snapshot
+
+    def get_snapshot(self) -> CategorySnapshot:
+        versions = get_versions(SNAPSHOT_SCOPES)
+        return self.current(versions) or self.load(versions)
+
+    async def aget_snapshot(self) -> CategorySnapshot:
+        versions = await aget_versions(SNAPSHOT_SCOPES)
+        return self.current(versions) or await sync_to_async(self.load)(versions)
+
+
+_catalog = CategoryCatalog()
+
+
+def get_category_catalog() -> CategoryCatalog:
+    return _catalog
+
+
+def get_categories() -> CategorySnapshot:
+    return get_category_catalog().get_snapshot()
+
+
+async def aget_categories() -> CategorySnapshot:
+    return await get_category_catalog().aget_snapshot()
+
+
+def get_category(slug) -> CategoryEntry | None:
+    return get_categories().get(slug)
+
+
+async def aget_category(slug) -> CategoryEntry | None:
+    return (await aget_categories()).get(slug)
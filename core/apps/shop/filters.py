@@ -1,9 +1,11 @@
 import django_filters
 
 from .models import Product, Review
+from .search import search_products
 
 
 class ProductFilter(django_filters.FilterSet):
+    search = django_filters.CharFilter(method='filter_search')
     name = django_filters.CharFilter(lookup_expr='icontains')
     max_price = django_filters.NumberFilter(field_name='price_current', lookup_expr='lte')
     min_price = django_filters.NumberFilter(field_name='price_current', lookup_expr='gte')
@@ -18,7 +20,10 @@ class ProductFilter(django_filters.FilterSet):
 
     class Meta:
         model = Product
-        fields = ['name', 'max_price', 'min_price', 'in_stock', 'created_at']
+        fields = ['search', 'name', 'max_price', 'min_price', 'in_stock', 'created_at']
+
+    def filter_search(self, queryset, name, value):
+        return search_products(queryset, value)
 
 
 class ReviewFilter(django_filters.FilterSet):
@@ -0,0 +1,231 @@
+import json
+import math
+import uuid
+from time import perf_counter
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from ....accounts.serializers import CustomTokenObtainPairSerializer
+from ....profiles.models import SellerOrder, ShippingAddress
+from ...cart import get_cart_store
+from ...models import Product
+from ...seed import seed_catalog
+
+
+# Name, method, URL, user sending the request ('buyer', 'seller' or None), JSON body.
+# Placeholders are filled from Command.request_values()
+ENDPOINTS = [
+    ('shop:categories', 'get', '/shop/categories/', None, None),
+    ('shop:products', 'get', '/shop/products/', None, None),
+    ('shop:products-cursor', 'get', '/shop/products/?cursor=', None, None),
+    ('shop:products-price', 'get', '/shop/products/?ordering=price', None, None),
+    ('shop:products-stream', 'get', '/shop/products/?stream=ndjson', None, None),
+    ('shop:products-category', 'get', '/shop/products/category/{category}', None, None),
+    ('shop:products-seller', 'get', '/shop/products/seller/{seller}', None, None),
+    ('shop:product', 'get', '/shop/products/{product}', None, None),
+    ('shop:reviews', 'get', '/shop/reviews/{product}', None, None),
+    ('shop:cart', 'get', '/shop/cart/', 'buyer', None),
+    ('shop:cart-add', 'post', '/shop/cart/', 'buyer', {'slug': '{product}', 'quantity': 1}),
+    ('shop:checkout', 'post', '/shop/checkout/', 'buyer', {'shipping_id': '{shipping_id}'}),
+    ('profiles:profile', 'get', '/profiles/', 'buyer', None),
+    ('profiles:shipping-addresses', 'get', '/profiles/shipping_addresses/', 'buyer', None),
+    ('profiles:orders', 'get', '/profiles/orders/', 'buyer', None),
+    ('profiles:order-items', 'get', '/profiles/orders/{tx_ref}', 'buyer', None),
+    ('profiles:reviews', 'get', '/profiles/reviews/', 'buyer', None),
+    ('sellers:seller', 'get', '/sellers/', 'seller', None),
+    ('sellers:products', 'get', '/sellers/products/', 'seller', None),
+    ('sellers:orders', 'get', '/sellers/orders/', 'seller', None),
+    ('sellers:order-items', 'get', '/sellers/orders/{tx_ref}', 'seller', None),
+    ('sellers:analytics', 'get', '/sellers/analytics/', 'seller', None),
+    ('accounts:register', 'post', '/auth/', None, {'email': '{new_email}', 'password': '{password}'}),
+    ('accounts:token', 'post', '/auth/token/', None, {'email': '{email}', 'password': '{password}'}),
+    ('accounts:token-refresh', 'post', '/auth/token/refresh/', None, {'refresh': '{refresh}'}),
+    ('accounts:token-verify', 'post', '/auth/token/verify/', None, {'token': '{access}'}),
+]
+
+METRICS = ('p50_ms', 'p95_ms', 'queries', 'bytes')
+
+# Smaller datasets seed too few orders for the order endpoints
+MIN_SIZE = 10
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list."""
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def read_content(response) -> bytes:
+    if not response.streaming:
+        return response.content
+    if response.is_async:
+        # Streaming responses of async views hold an async iterator
+        async def collect():
+            return b''.join([chunk async for chunk in response.streaming_content])
+        return async_to_sync(collect)()
+    return b''.join(response.streaming_content)
+
+
+class Command(BaseCommand):
+    help = ("Time every endpoint of shop, profiles, sellers and accounts through the test client on seeded "
+            "datasets of several sizes and report p50/p95 latency, queries and response bytes. "
+            "Seeded rows are rolled back. Results can be saved as a baseline and compared against one")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000],
+                            help=f"Numbers of products of the seeded datasets, other rows scale with them, "
+                                 f"at least {MIN_SIZE}")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed requests per endpoint")
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed requests per endpoint before those")
+        parser.add_argument('--only', nargs='+', default=[],
+                            help="Endpoints or apps to run, e.g. 'shop:products' or 'sellers'")
+        parser.add_argument('--warm-cache', action='store_true',
+                            help="Run with a local memory cache instead of none, to time cached responses")
+        parser.add_argument('--save', metavar='PATH', help="Write the results to a JSON baseline")
+        parser.add_argument('--compare', metavar='PATH', help="Compare the results with a saved baseline")
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help="Relative p95 increase over the baseline reported as a regression")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.password = 'seed-password'
+        if min(options['sizes']) < MIN_SIZE:
+            raise CommandError(f"--sizes have to be at least {MIN_SIZE}")
+        endpoints = [endpoint for endpoint in ENDPOINTS if self.selected(endpoint[0], options['only'])]
+        if not endpoints:
+            raise CommandError("No endpoint matches --only")
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+
+        cache = ({'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}
+                 if options['warm_cache'] else {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'})
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['*'], CACHES={'default': cache}):
+            for size in options['sizes']:
+                with transaction.atomic():
+                    self.prepare(size)
+                    results[str(size)] = {
+                        name: self.measure(name, method, url, user, body, options['warmup'], options['repeat'])
+                        for name, method, url, user, body in endpoints
+                    }
+                    transaction.set_rollback(True)
+                get_cart_store().clear(self.buyer.id)
+                self.report(size, results[str(size)], (baseline or {}).get('sizes', {}).get(str(size), {}))
+
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump({'vendor': connection.vendor, 'repeat': options['repeat'], 'sizes': results}, file, indent=2)
+            self.stdout.write(f"Saved the results to {options['save']}")
+        if baseline is not None:
+            regressions = self.regressions(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError("Slower than the baseline:\n" + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    @staticmethod
+    def selected(name, only):
+        return not only or any(name == item or name.startswith(item + ':') for item in only)
+
+    def prepare(self, size):
+        data = seed_catalog(products=size, categories=max(5, size // 1000), sellers=max(2, size // 100),
+                            buyers=max(20, size // 20), reviews=2, orders=size // 2, password=self.password)
+        seller_order = SellerOrder.objects.select_related('order__user', 'seller__user').filter(
+            order__in=data['orders'][:10]).first()
+        if seller_order is None:
+            raise CommandError(f"The dataset of {size} products has no orders, seed a larger one")
+        self.buyer, self.seller = seller_order.order.user, seller_order.seller.user
+        product = next(product for product in data['products'] if not product.is_deleted)
+        # Checkouts of every iteration buy this product
+        self.stocked = product
+        Product.objects.filter(pk=product.pk).update(in_stock=F('in_stock') + 10 ** 6)
+        self.values = {
+            'category': product.category.slug,
+            'seller': product.seller.slug,
+            'product': product.slug,
+            'tx_ref': seller_order.order.tx_ref,
+            'shipping_id': str(ShippingAddress.objects.filter(user=self.buyer).values_list('pk', flat=True)[0]),
+            'email': self.buyer.email,
+            'password': self.password,
+        }
+        self.headers = {
+            role: {'HTTP_AUTHORIZATION': f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'}
+            for role, user in (('buyer', self.buyer), ('seller', self.seller))
+        }
+
+    def request_values(self, name):
+        """Placeholder values of one request, endpoints that consume their input get a fresh one."""
+        values = dict(self.values)
+        if name == 'shop:checkout':
+            get_cart_store().update(self.buyer.id, {self.stocked.id: 1})
+        elif name == 'accounts:register':
+            values['new_email'] = f'bench-{uuid.uuid4().hex}@example.com'
+        elif name == 'accounts:token-refresh':
+            # Refresh tokens are blacklisted once rotated
+            values['refresh'] = str(CustomTokenObtainPairSerializer.get_token(self.buyer))
+        elif name == 'accounts:token-verify':
+            values['access'] = str(CustomTokenObtainPairSerializer.get_token(self.buyer).access_token)
+        return values
+
+    def measure(self, name, method, url, user, body, warmup, repeat):
+        client = Client()
+        headers = self.headers[user] if user else {}
+        timings, queries, sizes = [], [], []
+        for i in range(warmup + repeat):
+            values = self.request_values(name)
+            path = url.format(**values)
+            kwargs = {}
+            if body is not None:
+                kwargs = {'data': {key: value.format(**values) if isinstance(value, str) else value
+                                   for key, value in body.items()},
+                          'content_type': 'application/json'}
+            with CaptureQueriesContext(connection) as captured:
+                start = perf_counter()
+                response = getattr(client, method)(path, **kwargs, **headers)
+                content = read_content(response)
+                elapsed = perf_counter() - start
+            if response.status_code >= 400:
+                raise CommandError(f"{method.upper()} {path} returned {response.status_code}: {content[:200]!r}")
+            if i >= warmup:
+                timings.append(elapsed * 1000)
+                queries.append(len(captured))
+                sizes.append(len(content))
+        return {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'queries': max(queries),
+            'bytes': max(sizes),
+        }
+
+    def report(self, size, results, baseline):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{size} products"))
+        self.stdout.write(f"{'endpoint':<30}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'bytes':>10}")
+        for name, metrics in results.items():
+            line = f"{name:<30}{metrics['p50_ms']:>10.2f}{metrics['p95_ms']:>10.2f}" \
+                   f"{metrics['queries']:>9}{metrics['bytes']:>10}"
+            if name in baseline:
+                old = baseline[name]
+                line += f"   p95 {metrics['p95_ms'] - old['p95_ms']:+.2f} ms, " \
+                        f"{metrics['queries'] - old['queries']:+} queries, {metrics['bytes'] - old['bytes']:+} bytes"
+            self.stdout.write(line)
+
+    @staticmethod
+    def regressions(results, baseline, threshold):
+        found = []
+        for size, endpoints in results.items():
+            for name, metrics in endpoints.items():
+                old = baseline.get('sizes', {}).get(size, {}).get(name)
+                if old is None:
+                    continue
+                if metrics['queries'] > old['queries']:
+                    found.append(f"{name} at {size}: {old['queries']} -> {metrics['queries']} queries")
+                # Differences below a millisecond are noise
+                if metrics['p95_ms'] > old['p95_ms'] * (1 + threshold) and metrics['p95_ms'] - old['p95_ms'] > 1:
+                    found.append(f"{name} at {size}: p95 {old['p95_ms']} -> {metrics['p95_ms']} ms")
+        return found
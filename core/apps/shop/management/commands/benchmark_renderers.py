@@ -0,0 +1,71 @@
+from io import BytesIO
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from ....common.parsers import FastJSONParser
+from ....common.renderers import FastJSONRenderer, orjson
+from ...models import Product
+from ...seed import seed_catalog
+from ...serializers import ProductSerializer
+from .benchmark_endpoints import percentile
+
+
+class Command(BaseCommand):
+    help = ("Time JSONRenderer and JSONParser against FastJSONRenderer and FastJSONParser on pages of "
+            "ProductSerializer output from a seeded catalog, and fail if the rendered bytes differ. "
+            "Seeded rows are rolled back")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--pages', type=int, default=20, help="Pages rendered and parsed per round")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed rounds")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson isn't installed, the fast classes fall back to json"))
+        page_size = options['page_size']
+        with override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+            seed_catalog(products=page_size * options['pages'], categories=5, sellers=10, buyers=20, reviews=2,
+                         orders=0)
+            products = list(Product.objects.select_related('category', 'seller__user').order_by('-created_at'))
+            context = {'request': RequestFactory().get('/shop/products/')}
+            pages = [{'page_number': i + 1, 'total_pages': options['pages'],
+                      'result': ProductSerializer(products[start:start + page_size], many=True, context=context).data}
+                     for i, start in enumerate(range(0, len(products), page_size))]
+            transaction.set_rollback(True)
+
+        bodies = [JSONRenderer().render(page) for page in pages]
+        if [FastJSONRenderer().render(page) for page in pages] != bodies:
+            raise CommandError("FastJSONRenderer output differs from JSONRenderer")
+
+        self.stdout.write(f"{len(pages)} pages of {page_size} products, {sum(map(len, bodies)) // len(bodies)} "
+                          f"bytes on average, ms per page")
+        self.stdout.write(f"{'':<12}{'json p50':>10}{'json p95':>10}{'fast p50':>10}{'fast p95':>10}{'speedup':>9}")
+        self.report('render', options['repeat'], len(pages),
+                    lambda: [JSONRenderer().render(page) for page in pages],
+                    lambda: [FastJSONRenderer().render(page) for page in pages])
+        self.report('parse', options['repeat'], len(pages),
+                    lambda: [JSONParser().parse(BytesIO(body)) for body in bodies],
+                    lambda: [FastJSONParser().parse(BytesIO(body)) for body in bodies])
+
+    def report(self, name, repeat, count, baseline, candidate):
+        old, new = self.timings(baseline, repeat, count), self.timings(candidate, repeat, count)
+        self.stdout.write(f"{name:<12}{percentile(old, 50):>10.3f}{percentile(old, 95):>10.3f}"
+                          f"{percentile(new, 50):>10.3f}{percentile(new, 95):>10.3f}"
+                          f"{percentile(old, 50) / percentile(new, 50):>8.1f}x")
+
+    @staticmethod
+    def timings(run, repeat, count):
+        run()
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            run()
+            timings.append((perf_counter() - start) * 1000 / count)
+        return timings
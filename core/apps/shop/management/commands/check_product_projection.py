@@ -0,0 +1,65 @@
+from decimal import Decimal
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from ...models import Product
+from ...seed import seed_catalog
+from ...serializers import ProductListSerializer, ProductSerializer
+
+
+RENDITIONS = {'image1': {'source': {'jpg': 'product_images/seed.jpg'},
+                         'small': {'webp': 'renditions/seed-small.webp', 'jpg': 'renditions/seed-small.jpg'}}}
+
+
+class Command(BaseCommand):
+    help = ("Compare the output of ProductListSerializer on projected rows with ProductSerializer on model "
+            "instances for every product of a seeded catalog, with and without a request in the context, "
+            "and fail on the first difference. Seeded rows are rolled back")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=500, help="Size of the seeded catalog")
+
+    def handle(self, *args, **options):
+        with override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+            seed_catalog(products=options['products'], categories=5, sellers=5, buyers=20, reviews=2, orders=0)
+            self.add_edge_cases()
+            queryset = Product.objects.order_by('-created_at', '-id')
+            for context in ({}, {'request': RequestFactory().get('/shop/products/')}):
+                self.compare(queryset, context)
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("ProductListSerializer matches ProductSerializer"))
+
+    @staticmethod
+    def add_edge_cases():
+        """Give some products the values seeding leaves out: no seller, no old price, more images, renditions."""
+        ids = list(Product.objects.values_list('id', flat=True)[:40])
+        Product.objects.filter(id__in=ids[:10]).update(seller=None)
+        Product.objects.filter(id__in=ids[10:20]).update(price_old=Decimal('1234.50'))
+        Product.objects.filter(id__in=ids[20:30]).update(image2='product_images/second.jpg', rating_avg=Decimal('4.25'))
+        Product.objects.filter(id__in=ids[30:40]).update(renditions=RENDITIONS)
+
+    def compare(self, queryset, context):
+        start = perf_counter()
+        expected = ProductSerializer(queryset.select_related('category', 'seller__user'), many=True,
+                                     context=context).data
+        middle = perf_counter()
+        actual = ProductListSerializer(ProductListSerializer.project(queryset), many=True, context=context).data
+        end = perf_counter()
+
+        if len(actual) != len(expected):
+            raise CommandError(f"{len(actual)} projected products, {len(expected)} serialized")
+        renderer = JSONRenderer()
+        for old, new in zip(expected, actual):
+            # Rendered, so key order and value types have to match too
+            if renderer.render(old) != renderer.render(new):
+                diff = {key: (old.get(key), new.get(key)) for key in old.keys() | new.keys()
+                        if old.get(key) != new.get(key)} or 'key order'
+                raise CommandError(f"Product {old['slug']} differs: {diff}")
+        self.stdout.write(f"{len(actual)} products match {'with' if context else 'without'} a request: "
+                          f"{(middle - start) * 1000:.1f} ms through instances, "
+                          f"{(end - middle) * 1000:.1f} ms through projected rows")
@@ -0,0 +1,139 @@
+import json
+import re
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ...seed import seed_catalog
+
+
+# Tables big enough that a full scan on a listed endpoint is a bug
+CHECKED_TABLES = ('shop_product', 'shop_review', 'profiles_order')
+
+# Endpoint, whether it needs an authenticated buyer, index the main query is expected to use
+ENDPOINTS = [
+    ('/shop/products/', False, 'product_live_created_idx'),
+    ('/shop/products/?cursor=', False, 'product_live_created_idx'),
+    ('/shop/products/?ordering=price', False, 'product_live_price_idx'),
+    ('/shop/products/?min_price=10&max_price=11', False, 'product_live_price_idx'),
+    ('/shop/products/category/{category}', False, 'product_live_category_idx'),
+    ('/shop/products/seller/{seller}', False, 'product_live_seller_idx'),
+    ('/shop/reviews/{product}', False, 'review_live_product_idx'),
+    ('/profiles/reviews/', True, 'review_live_user_idx'),
+    ('/profiles/orders/', True, 'order_user_created_idx'),
+]
+
+
+class Command(BaseCommand):
+    help = ("EXPLAIN the queries of the catalog, review and order list endpoints on a seeded dataset "
+            "and fail if any of them reads a big table with a sequential scan")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000, help="Size of the seeded catalog")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded rows instead of rolling back")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f"Plans of {connection.vendor} are not supported")
+        self.verbosity = options['verbosity']
+        with transaction.atomic():
+            data = seed_catalog(products=options['products'], orders=options['products'] // 5)
+            failures = self.check_endpoints(data)
+            if not options['keep']:
+                transaction.set_rollback(True)
+        if failures:
+            raise CommandError(f"{failures} endpoint(s) fall back to a full scan")
+        self.stdout.write(self.style.SUCCESS("Every endpoint is served by indexes"))
+
+    def check_endpoints(self, data):
+        product = next(product for product in data['products'] if not product.is_deleted)
+        buyer = data['buyers'][0]
+        values = {'category': product.category.slug, 'seller': product.seller.slug, 'product': product.slug}
+        client = Client()
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(buyer).access_token}'}
+        failures = 0
+        with override_settings(ALLOWED_HOSTS=['*'], CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}), self.no_seqscan():
+            for url, authenticated, expected_index in ENDPOINTS:
+                url = url.format(**values)
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url, **headers) if authenticated else client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f"GET {url} returned {response.status_code}")
+                statements = [query['sql'] for query in queries.captured_queries if self.should_explain(query['sql'])]
+                plans = [self.explain(sql) for sql in statements]
+                scans = sorted({table for sql in statements for table in self.full_scans(sql)})
+                uses_index = any(expected_index in plan for plan in plans)
+                if scans:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f"FAIL {url}: full scan of {', '.join(scans)}"))
+                    for plan in plans:
+                        self.stdout.write(plan)
+                else:
+                    note = '' if uses_index else f" (planner chose another index than {expected_index})"
+                    self.stdout.write(f"ok   {url}{note}")
+                    if self.verbosity > 1:
+                        for plan in plans:
+                            self.stdout.write(plan)
+        return failures
+
+    @staticmethod
+    @contextmanager
+    def no_seqscan():
+        # Make the PostgreSQL planner avoid sequential scans whenever an index can serve the query,
+        # so the plan shows whether such an index exists and not what is cheapest on seeded data
+        if connection.vendor != 'postgresql':
+            yield
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = on')
+
+    @staticmethod
+    def should_explain(sql):
+        if not sql.startswith('SELECT') or not any(f'"{table}"' in sql for table in CHECKED_TABLES):
+            return False
+        # SQLite has no switch like enable_seqscan and counts a whole table by reading it,
+        # page counts of the full catalog are only checked on PostgreSQL
+        return not (connection.vendor == 'sqlite' and sql.startswith('SELECT COUNT(*)'))
+
+    @staticmethod
+    def explain(sql, options=''):
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else f'EXPLAIN {options}'
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            rows = cursor.fetchall()
+        if options:
+            return rows[0][0]
+        return '\n'.join(str(row[-1]) for row in rows)
+
+    def full_scans(self, sql):
+        """Checked tables the query reads in full, through the heap or by walking a whole index."""
+        if connection.vendor == 'sqlite':
+            # "SCAN t" reads the table, "SCAN t USING INDEX i" walks an index in order
+            pattern = r'\bSCAN ("?)(\w+)\1(?! USING)(?:$|\s)'
+            found = {match.group(2) for match in re.finditer(pattern, self.explain(sql), re.MULTILINE)}
+            return found & set(CHECKED_TABLES)
+        plan = self.explain(sql, '(FORMAT JSON) ')
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        found, nodes = set(), [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.get('Plans', []))
+            if node.get('Relation Name') not in CHECKED_TABLES:
+                continue
+            # An index scan without an index condition that filters rows walks the whole index
+            if node['Node Type'] == 'Seq Scan' or (
+                    node['Node Type'] in ('Index Scan', 'Index Only Scan')
+                    and 'Index Cond' not in node and 'Filter' in node):
+                found.add(node['Relation Name'])
+        return found
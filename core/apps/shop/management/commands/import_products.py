@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ....sellers.models import Seller
+from ...bulk import FILE_FORMATS, guess_file_format, import_products, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk create products of a seller from a CSV or NDJSON file, nothing is created if any row is invalid"
+
+    def add_arguments(self, parser):
+        parser.add_argument('seller_slug')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=list(FILE_FORMATS), help="Guessed from the file extension by default")
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        seller = Seller.objects.get_or_none(slug=options['seller_slug'])
+        if not seller:
+            raise CommandError("Seller doesn't exist")
+        file_format = options['format'] or guess_file_format(options['path'])
+        if file_format not in FILE_FORMATS:
+            raise CommandError(f"Unknown file format, use --format {'/'.join(FILE_FORMATS)}")
+        with open(options['path'], 'rb') as file:
+            report = import_products(seller, read_rows(file, file_format), options['chunk_size'])
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} products, rejected {len(report['errors'])} rows"))
@@ -0,0 +1,33 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ....profiles.models import OrderItem
+from ...cart import get_cart_store
+
+
+class Command(BaseCommand):
+    help = "Move cart lines stored as OrderItem rows without an order into the cart store"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+        if not store.shared:
+            # The carts would only live as long as this command, and their rows are deleted
+            raise CommandError(f"{type(store).__name__} keeps carts in this process, set CART_BACKEND "
+                               f"(REDIS_URL) to a shared store before moving carts")
+        rows = OrderItem.objects.filter(order=None).values_list('user_id', 'product_id', 'quantity')
+        moved = 0
+        with transaction.atomic():
+            carts = defaultdict(dict)
+            for user_id, product_id, quantity in rows.iterator(chunk_size=options['batch_size']):
+                if quantity:
+                    carts[user_id][product_id] = quantity
+            for user_id, quantities in carts.items():
+                store.update(user_id, quantities)
+                moved += len(quantities)
+            OrderItem.objects.filter(order=None).delete()
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} cart lines of {len(carts)} users"))
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from ....accounts.models import User
+from ....common.cache import invalidate
+from ....common.images import render_image, run_in_worker, stale_fields, update_renditions
+from ...cache import SELLERS_SCOPE, invalidate_catalog
+from ...models import Category, Product
+
+
+MODELS = {
+    'product': Product,
+    'category': Category,
+    'user': User,
+}
+
+
+class Command(BaseCommand):
+    help = ("Generate missing or outdated image renditions of products, categories and avatars in parallel, "
+            "retrying images that failed before")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--models', nargs='+', choices=list(MODELS), default=list(MODELS))
+        parser.add_argument('--workers', type=int, default=4, help="0 renders in the command's own thread")
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--force', action='store_true', help="Render every image, not only outdated ones")
+
+    def handle(self, *args, **options):
+        rendered = 0
+        self.rendered_sources = set()
+        executor = ThreadPoolExecutor(max_workers=options['workers']) if options['workers'] else None
+        try:
+            for label in options['models']:
+                count = self.rebuild(MODELS[label], executor, options['batch_size'], options['force'])
+                self.stdout.write(f"{label}: rendered images of {count} rows")
+                rendered += count
+        finally:
+            if executor:
+                executor.shutdown()
+        if rendered:
+            invalidate_catalog()
+            invalidate(SELLERS_SCOPE)
+        self.stdout.write(self.style.SUCCESS(f"Rendered images of {rendered} rows"))
+
+    def rebuild(self, model, executor, batch_size, force):
+        rows = model._base_manager.order_by('pk').only('pk', 'renditions', *model.IMAGE_FIELDS)
+        count, last_pk = 0, None
+        while True:
+            # Each batch is read in full before rendering, no cursor stays open while workers write
+            batch = list(rows.filter(pk__gt=last_pk)[:batch_size] if last_pk else rows[:batch_size])
+            if not batch:
+                return count
+            last_pk = batch[-1].pk
+            jobs, sources = [], set()
+            for instance in batch:
+                field_names = (list(model.IMAGE_FIELDS) if force
+                               else stale_fields(instance, model.IMAGE_FIELDS, retry_failed=True))
+                if field_names:
+                    jobs.append((model, instance.pk, field_names))
+                    sources.update(getattr(instance, field_name).name or '' for field_name in field_names)
+            # Rows often share an original (bulk imports, the default avatar): render each one
+            # once, so rows only pick up existing files and workers never write the same path
+            sources -= self.rendered_sources | {''}
+            self.run(executor, self.render_source, [(name, force) for name in sources])
+            self.rendered_sources |= sources
+            count += self.run(executor, update_renditions, jobs)
+
+    def render_source(self, name, overwrite):
+        try:
+            render_image(name, overwrite)
+        except Exception as exc:
+            self.stderr.write(f"Can't render {name}: {exc}")
+
+    @staticmethod
+    def run(executor, function, jobs):
+        if executor:
+            list(executor.map(lambda job: run_in_worker(function, *job), jobs))
+        else:
+            for job in jobs:
+                function(*job)
+        return len(jobs)
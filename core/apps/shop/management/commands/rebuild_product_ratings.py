@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from ...cache import invalidate_catalog
+from ...models import Product
+
+
+class Command(BaseCommand):
+    help = ("Recalculate stored rating_avg, rating_sum and reviews_count of every product from its reviews. "
+            "Run it after changing ratings with queryset update()")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        live_reviews = Q(reviews__is_deleted=False)
+        products = Product.objects.unfiltered().order_by('pk').only(
+            'pk', 'rating_avg', 'rating_sum', 'reviews_count'
+        ).annotate(
+            live_sum=Coalesce(Sum('reviews__rating', filter=live_reviews), 0),
+            live_count=Count('reviews', filter=live_reviews),
+        )
+        changed, updated = [], 0
+        for product in products.iterator(chunk_size=batch_size):
+            rating_avg = Product.calculate_rating(product.live_sum, product.live_count)
+            if (product.rating_sum, product.reviews_count, product.rating_avg) == \
+                    (product.live_sum, product.live_count, rating_avg):
+                continue
+            product.rating_sum = product.live_sum
+            product.reviews_count = product.live_count
+            product.rating_avg = rating_avg
+            changed.append(product)
+            if len(changed) >= batch_size:
+                updated += self.flush(changed)
+        updated += self.flush(changed)
+        if updated:
+            invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(f"Updated rating of {updated} products"))
+
+    @staticmethod
+    def flush(products):
+        with transaction.atomic():
+            Product.objects.unfiltered().bulk_update(products, ['rating_sum', 'reviews_count', 'rating_avg'])
+        count = len(products)
+        products.clear()
+        return count
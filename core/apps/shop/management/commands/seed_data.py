@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...cache import invalidate_catalog
+from ...seed import seed_catalog
+
+
+# Counts at --scale 1
+DEFAULTS = {'products': 1000, 'categories': 10, 'sellers': 20, 'buyers': 200, 'orders': 1000, 'carts': 50}
+
+
+class Command(BaseCommand):
+    help = ("Bulk insert a synthetic dataset of users, sellers, categories, products, reviews, carts and orders. "
+            "--scale multiplies every default count, explicit counts win over it")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1)
+        for name, default in DEFAULTS.items():
+            parser.add_argument(f'--{name}', type=int, help=f"Defaults to {default} times --scale")
+        parser.add_argument('--reviews', type=int, default=3, help="Reviews per product")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the random generator")
+        parser.add_argument('--password', default='seed-password', help="Password of every generated user")
+
+    def handle(self, *args, **options):
+        counts = {name: options[name] if options[name] is not None else max(1, round(default * options['scale']))
+                  for name, default in DEFAULTS.items()}
+        with transaction.atomic():
+            data = seed_catalog(reviews=options['reviews'], batch_size=options['batch_size'], seed=options['seed'],
+                                password=options['password'], **counts)
+        invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(data['sellers'])} sellers, {len(data['buyers'])} buyers, {len(data['categories'])} "
+            f"categories, {len(data['products'])} products and {len(data['orders'])} orders. "
+            f"Users log in with '{options['password']}'"))
@@ -0,0 +1,97 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:00
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE FUNCTION shop_product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER shop_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description, search_vector ON shop_product
+    FOR EACH ROW EXECUTE FUNCTION shop_product_search_vector_update()
+    """,
+    "UPDATE shop_product SET search_vector = NULL",
+    "CREATE INDEX shop_product_search_vector_idx ON shop_product USING gin (search_vector)",
+    "CREATE INDEX shop_product_name_trgm_idx ON shop_product USING gin (name gin_trgm_ops)",
+    # Matches the UPPER(...) LIKE expression Django builds for `name__icontains`
+    "CREATE INDEX shop_product_name_upper_trgm_idx ON shop_product USING gin (UPPER(name::text) gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS shop_product_name_upper_trgm_idx",
+    "DROP INDEX IF EXISTS shop_product_name_trgm_idx",
+    "DROP INDEX IF EXISTS shop_product_search_vector_idx",
+    "DROP TRIGGER IF EXISTS shop_product_search_vector_trigger ON shop_product",
+    "DROP FUNCTION IF EXISTS shop_product_search_vector_update()",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE shop_product_fts USING fts5(
+        product_id UNINDEXED, name, description, tokenize = 'porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER shop_product_fts_insert AFTER INSERT ON shop_product BEGIN
+        INSERT INTO shop_product_fts (product_id, name, description)
+        VALUES (NEW.id, NEW.name, NEW.description);
+    END
+    """,
+    """
+    CREATE TRIGGER shop_product_fts_update AFTER UPDATE OF name, description ON shop_product BEGIN
+        DELETE FROM shop_product_fts WHERE product_id = OLD.id;
+        INSERT INTO shop_product_fts (product_id, name, description)
+        VALUES (NEW.id, NEW.name, NEW.description);
+    END
+    """,
+    """
+    CREATE TRIGGER shop_product_fts_delete AFTER DELETE ON shop_product BEGIN
+        DELETE FROM shop_product_fts WHERE product_id = OLD.id;
+    END
+    """,
+    "INSERT INTO shop_product_fts (product_id, name, description) SELECT id, name, description FROM shop_product",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS shop_product_fts_delete",
+    "DROP TRIGGER IF EXISTS shop_product_fts_update",
+    "DROP TRIGGER IF EXISTS shop_product_fts_insert",
+    "DROP TABLE IF EXISTS shop_product_fts",
+]
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_product_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_vendor_sql({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run_vendor_sql({'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+        ),
+    ]
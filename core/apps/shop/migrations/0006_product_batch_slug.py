@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:04
+
+import apps.common.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0005_product_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='slug',
+            field=apps.common.fields.BatchAutoSlugField(editable=False, populate_from='name', unique=True),
+        ),
+    ]
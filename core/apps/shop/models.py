@@ -1,15 +1,30 @@
-from django.db import models
+from decimal import Decimal
+
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.dispatch import Signal
+from django.utils import timezone
 from autoslug import AutoSlugField
 
+from ..common.fields import BatchAutoSlugField
+from ..common.managers import IsDeletedManager, IsDeletedQuerySet
 from ..common.models import BaseModel, IsDeletedModel
 from ..sellers.models import Seller
 from ..accounts.models import User
 
 
+# Sent by Product.apply_review_change() with product, review, rating_delta and count_delta
+review_changed = Signal()
+
+
 class Category(BaseModel):
+    IMAGE_FIELDS = ('image',)
+
     name = models.CharField(max_length=100, unique=True)
     slug = AutoSlugField(populate_from='name', unique_with='name', always_update=True)
     image = models.ImageField(upload_to='category_images/')
+    # Resized copies of the image, see common/images.py
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return self.name
@@ -19,9 +34,11 @@ class Category(BaseModel):
 
 
 class Product(IsDeletedModel):
+    IMAGE_FIELDS = ('image1', 'image2', 'image3')
+
     seller = models.ForeignKey(Seller, on_delete=models.SET_NULL, related_name='products', null=True)
     name = models.CharField(max_length=150)
-    slug = AutoSlugField(populate_from='name', unique=True, db_index=True)
+    slug = BatchAutoSlugField(populate_from='name', unique=True, db_index=True)
     description = models.TextField()
     price_old = models.DecimalField(max_digits=10, decimal_places=2, null=True)
     price_current = models.DecimalField(max_digits=10, decimal_places=2)
@@ -31,19 +48,77 @@ class Product(IsDeletedModel):
     image1 = models.ImageField(upload_to='product_images/')
     image2 = models.ImageField(upload_to='product_images/', blank=True)
     image3 = models.ImageField(upload_to='product_images/', blank=True)
+    # Resized copies of the images, see common/images.py
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+
+    # Denormalized review statistics, kept in sync by apply_review_change(), see ReviewQuerySet
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+    rating_sum = models.PositiveIntegerField(default=0)
+    reviews_count = models.PositiveIntegerField(default=0)
 
-    @property
-    def get_rating(self):
-        rating = self.reviews.aggregate(models.Avg('rating'))['rating__avg']
-        return rating
+    # Filled by a database trigger from name and description, see search.py
+    search_vector = SearchVectorField(null=True, editable=False)
 
-    @property
-    def get_reviews_count(self):
-        return self.reviews.count()
+    @staticmethod
+    def calculate_rating(rating_sum, reviews_count):
+        if not reviews_count:
+            return None
+        return (Decimal(rating_sum) / reviews_count).quantize(Decimal('0.01'))
+
+    def apply_review_change(self, rating_delta=0, count_delta=0, review=None):
+        """
+        Shift stored review statistics by the given deltas under a row lock.
+        Receivers of review_changed are told which review caused the change.
+        """
+        with transaction.atomic():
+            products = Product.objects.unfiltered().filter(pk=self.pk)
+            rating_sum, reviews_count = products.select_for_update().values_list(
+                'rating_sum', 'reviews_count').get()
+            self.rating_sum = rating_sum + rating_delta
+            self.reviews_count = reviews_count + count_delta
+            self.rating_avg = self.calculate_rating(self.rating_sum, self.reviews_count)
+            products.update(rating_sum=self.rating_sum, reviews_count=self.reviews_count,
+                            rating_avg=self.rating_avg, updated_at=timezone.now())
+            if review is not None and (rating_delta or count_delta):
+                review_changed.send(sender=Product, product=self, review=review, rating_delta=rating_delta,
+                                    count_delta=count_delta)
 
     def __str__(self):
         return self.name
 
+    class Meta(IsDeletedModel.Meta):
+        # Partial indexes hold live rows only, matching the is_deleted=False every default query has
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_deleted=False),
+                         name='product_live_created_idx'),
+            models.Index(fields=['price_current', 'id'], condition=models.Q(is_deleted=False),
+                         name='product_live_price_idx'),
+            models.Index(fields=['category', '-created_at'], condition=models.Q(is_deleted=False),
+                         name='product_live_category_idx'),
+            models.Index(fields=['seller', '-created_at'], condition=models.Q(is_deleted=False),
+                         name='product_live_seller_idx'),
+        ]
+
+
+class ReviewQuerySet(IsDeletedQuerySet):
+    """
+    Deleting reviews keeps the rating statistics of their products in sync: soft
+    deletes here, hard deletes through pre_delete in signals.py. update() doesn't,
+    run rebuild_product_ratings after changing rating or is_deleted with it.
+    """
+
+    def delete(self, hard_delete=False):
+        if hard_delete:
+            return super().delete(hard_delete=True)
+        with transaction.atomic():
+            for review in self.filter(is_deleted=False).select_related('product').select_for_update(of=('self',)):
+                review.product.apply_review_change(-(review.rating or 0), -1, review=review)
+            return super().delete()
+
+
+class ReviewManager(IsDeletedManager):
+    queryset_class = ReviewQuerySet
+
 
 class Review(IsDeletedModel):
     RATING_CHOICES = (
@@ -55,5 +130,20 @@ class Review(IsDeletedModel):
     rating = models.PositiveIntegerField(null=True, choices=RATING_CHOICES)
     text = models.TextField(null=True)
 
-    class Meta:
-        unique_together = ['user', 'product']
\ No newline at end of file
+    objects = ReviewManager()
+
+    class Meta(IsDeletedModel.Meta):
+        unique_together = ['user', 'product']
+        indexes = [
+            models.Index(fields=['product', '-created_at'], condition=models.Q(is_deleted=False),
+                         name='review_live_product_idx'),
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_deleted=False),
+                         name='review_live_user_idx'),
+        ]
+
+    def delete(self, *args, **kwargs):
+        # Hard deletes are counted by the pre_delete receiver in signals.py, cascades included
+        with transaction.atomic():
+            if not self.is_deleted:
+                self.product.apply_review_change(-(self.rating or 0), -1, review=self)
+            super().delete(*args, **kwargs)
@@ -1,8 +1,27 @@
 from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
 from core import settings
 
+from ..common.fieldsets import FIELDSET_PARAMS
+
+
+STREAM_PARAMS = [
+    OpenApiParameter(
+        name="stream",
+        description="Stream all results unpaginated, as 'ndjson' (one product per line) or 'json' (array)",
+        required=False,
+        type=OpenApiTypes.STR,
+        enum=["ndjson", "json"],
+    ),
+]
+
 
 PRODUCT_PARAMS = [
+    OpenApiParameter(
+        name="cursor",
+        description="Switch to cursor pagination, send it empty for the first page and then follow 'next'/'previous' links",
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
     OpenApiParameter(
         name="page",
         description="Retrieve a particular page. Defaults to 1",
@@ -21,6 +40,13 @@ PRODUCT_PARAMS = [
         required=False,
         type=OpenApiTypes.STR,
     ),
+    OpenApiParameter(
+        name="search",
+        description="Full-text search in product name and description, products must contain every word, "
+                    "punctuation is ignored. Results are ranked by relevance unless 'ordering' is given",
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
     OpenApiParameter(
         name="name",
         description="Filter products by words containing",
@@ -51,10 +77,18 @@ PRODUCT_PARAMS = [
         required=False,
         type=OpenApiTypes.DATE,
     ),
+    *STREAM_PARAMS,
+    *FIELDSET_PARAMS,
 ]
 
 
 REVIEWS_PARAMS = [
+    OpenApiParameter(
+        name="cursor",
+        description="Switch to cursor pagination, send it empty for the first page and then follow 'next'/'previous' links",
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
     OpenApiParameter(
         name="page",
         description="Retrieve a particular page. Defaults to 1",
@@ -79,4 +113,16 @@ REVIEWS_PARAMS = [
         required=False,
         type=OpenApiTypes.STR,
     ),
+    *FIELDSET_PARAMS,
+]
+
+
+BULK_EXPORT_PARAMS = [
+    OpenApiParameter(
+        name="file_format",
+        description="Format of the export: 'csv' (default) or 'ndjson'",
+        required=False,
+        type=OpenApiTypes.STR,
+        enum=["csv", "ndjson"],
+    ),
 ]
\ No newline at end of file
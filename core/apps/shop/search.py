@@ -0,0 +1,96 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import F, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+
+# Has to match the configuration used by the trigger in migration 0005_product_search
+SEARCH_CONFIG = 'english'
+
+# Same triggers as in migration 0005_product_search
+SQLITE_TRIGGERS = {
+    'shop_product_fts_insert': """
+    CREATE TRIGGER shop_product_fts_insert AFTER INSERT ON shop_product BEGIN
+        INSERT INTO shop_product_fts (product_id, name, description)
+        VALUES (NEW.id, NEW.name, NEW.description);
+    END
+    """,
+    'shop_product_fts_update': """
+    CREATE TRIGGER shop_product_fts_update AFTER UPDATE OF name, description ON shop_product BEGIN
+        DELETE FROM shop_product_fts WHERE product_id = OLD.id;
+        INSERT INTO shop_product_fts (product_id, name, description)
+        VALUES (NEW.id, NEW.name, NEW.description);
+    END
+    """,
+    'shop_product_fts_delete': """
+    CREATE TRIGGER shop_product_fts_delete AFTER DELETE ON shop_product BEGIN
+        DELETE FROM shop_product_fts WHERE product_id = OLD.id;
+    END
+    """,
+}
+
+
+def search_products(queryset, value):
+    """
+    Full-text search over product name and description, ranked by relevance.
+
+    On PostgreSQL it uses the trigger maintained `search_vector` (GIN indexed) and
+    trigram similarity of the name for fuzzy matches. On SQLite it falls back to
+    the `shop_product_fts` FTS5 table. Both stem English words, and both only
+    take the words of `value`, which all have to match: quotes, `-`, `*` and `or`
+    are no query syntax on either.
+    """
+    words = re.findall(r'\w+', value)
+    if not words:
+        return queryset.none()
+    if connection.vendor == 'postgresql':
+        return search_postgresql(queryset, words)
+    return search_sqlite(queryset, words)
+
+
+def search_postgresql(queryset, words):
+    text = ' '.join(words)
+    query = SearchQuery(text, search_type='plain', config=SEARCH_CONFIG)
+    return queryset.filter(Q(search_vector=query) | Q(name__trigram_similar=text)).annotate(
+        search_rank=SearchRank(F('search_vector'), query) + TrigramSimilarity('name', text)
+    ).order_by('-search_rank')
+
+
+def search_sqlite(queryset, words):
+    # Quote every word, so it can't be parsed as FTS5 query syntax
+    match = ' '.join(f'"{word}"' for word in words)
+    table = queryset.model._meta.db_table
+    matches = RawSQL(f"SELECT product_id FROM {table}_fts WHERE {table}_fts MATCH %s", (match,))
+    # bm25() is lower for better matches; column weights follow the PostgreSQL A/B weights
+    rank = RawSQL(
+        f"SELECT -bm25({table}_fts, 0, 10.0, 4.0) FROM {table}_fts "
+        f"WHERE {table}_fts MATCH %s AND {table}_fts.product_id = {table}.id",
+        (match,), output_field=FloatField()
+    )
+    return queryset.filter(id__in=matches).annotate(search_rank=rank).order_by('-search_rank')
+
+
+def restore_sqlite_triggers(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate handler. SQLite can't alter columns in place, so migrations that
+    alter shop_product rebuild the table and silently drop its triggers; create
+    the missing ones again and resync the FTS table.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        if 'shop_product_fts' not in db.introspection.table_names(cursor):
+            return
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'shop_product'")
+        existing = {name for name, in cursor.fetchall()}
+        missing = [sql for name, sql in SQLITE_TRIGGERS.items() if name not in existing]
+        if not missing:
+            return
+        for sql in missing:
+            cursor.execute(sql)
+        cursor.execute("DELETE FROM shop_product_fts")
+        cursor.execute("INSERT INTO shop_product_fts (product_id, name, description) "
+                       "SELECT id, name, description FROM shop_product")
@@ -0,0 +1,115 @@
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.utils import timezone
+
+from ..accounts.models import User
+from ..common.utils import generate_unique_code
+from ..profiles.models import Order, OrderItem, SellerOrder, ShippingAddress
+from ..sellers.analytics import rebuild_rollups
+from ..sellers.models import Seller
+from .cart import get_cart_store
+from .models import Category, Product, Review
+
+
+def seed_catalog(products=10000, categories=10, sellers=20, buyers=200, reviews=3, orders=1000, carts=0,
+                 batch_size=1000, seed=0, password='seed-password'):
+    """
+    Bulk insert a synthetic catalog for query plan checks and benchmarks.
+
+    `reviews` is the number of reviews per product, `carts` the number of buyers
+    who get three products in their cart. Every generated user gets the same
+    password, every buyer a shipping address. Model signals don't run, rating
+    statistics of products and sales rollups of sellers are filled in here, so
+    call invalidate_catalog() if the data should show up in cached pages.
+    Returns the created sellers, buyers, categories, products and orders.
+    """
+    rnd = random.Random(seed)
+    # Unique per run, so seeding twice doesn't hit unique emails and slugs
+    prefix = f'seed{uuid.uuid4().hex[:6]}'
+    password = make_password(password)
+
+    users = [User(first_name='Seller', last_name=str(i), email=f'{prefix}-seller{i}@example.com',
+                  password=password, account_type='SELLER') for i in range(sellers)]
+    users += [User(first_name='Buyer', last_name=str(i), email=f'{prefix}-buyer{i}@example.com',
+                   password=password) for i in range(buyers)]
+    User.objects.bulk_create(users, batch_size=batch_size)
+    seller_users, buyer_users = users[:sellers], users[sellers:]
+
+    seller_rows = Seller.objects.bulk_create([
+        Seller(user=user, business_name=f'{prefix} Shop {i}', inn_number='1234567890', phone_number='+70000000000',
+               business_description='Seeded shop', business_address='Main street 1', city='Moscow',
+               postal_code='101000', bank_name='Bank', bic_bank_number='044525225',
+               bank_account_number='40702810000000000000', bank_routing_number='30101810400000000225',
+               is_approved=True)
+        for i, user in enumerate(seller_users)
+    ], batch_size=batch_size)
+
+    category_rows = Category.objects.bulk_create([
+        Category(name=f'{prefix} Category {i}', image='category_images/seed.jpg')
+        for i in range(categories)
+    ], batch_size=batch_size)
+
+    product_rows = []
+    for i in range(products):
+        product = Product(seller=rnd.choice(seller_rows), category=rnd.choice(category_rows),
+                          name=f'{prefix} Product {i}', description=f'Seeded product number {i}',
+                          price_current=Decimal(rnd.randrange(100, 100000)) / 100, in_stock=rnd.randrange(100),
+                          image1='product_images/seed.jpg', is_deleted=not rnd.randrange(20))
+        product.slug, product._slug_reserved = f'{prefix}-product-{i}', True
+        product_rows.append(product)
+
+    review_rows = []
+    if buyer_users and reviews:
+        review_rows = [Review(user=user, product=product, rating=rnd.randrange(1, 6), text='Seeded review')
+                       for product in product_rows
+                       for user in rnd.sample(buyer_users, min(reviews, len(buyer_users)))]
+        for review in review_rows:
+            review.product.rating_sum += review.rating
+            review.product.reviews_count += 1
+        for product in product_rows:
+            product.rating_avg = Product.calculate_rating(product.rating_sum, product.reviews_count)
+    Product.objects.bulk_create(product_rows, batch_size=batch_size)
+    Review.objects.bulk_create(review_rows, batch_size=batch_size)
+
+    ShippingAddress.objects.bulk_create([
+        ShippingAddress(user=user, full_name=user.full_name, email=user.email, phone='+70000000000',
+                        address='Main street 1', city='Moscow', country='Russia', zipcode='101000')
+        for user in buyer_users
+    ], batch_size=batch_size)
+
+    live_products = [product for product in product_rows if not product.is_deleted and product.in_stock]
+    cart_store = get_cart_store()
+    for user in buyer_users[:carts]:
+        cart_store.update(user.id, {product.id: 1 for product in rnd.sample(live_products, min(3, len(live_products)))})
+
+    order_rows = []
+    if buyer_users and orders:
+        order_rows = [Order(user=rnd.choice(buyer_users), tx_ref=generate_unique_code(), full_name='Seeded buyer',
+                            email='buyer@example.com', city='Moscow', country='Russia', zipcode='101000')
+                      for _ in range(orders)]
+        Order.objects.bulk_create(order_rows, batch_size=batch_size)
+        items, seller_orders = [], []
+        for order in order_rows:
+            lines = [OrderItem(user=order.user, order=order, product=product, quantity=rnd.randrange(1, 4))
+                     for product in rnd.sample(product_rows, min(3, len(product_rows)))]
+            for item in lines:
+                item.set_purchase_price(item.product.price_current)
+            order.subtotal = order.total = sum(item.line_total for item in lines)
+            seller_orders += SellerOrder.split(order, lines)
+            items += lines
+        SellerOrder.objects.bulk_create(seller_orders, batch_size=batch_size)
+        OrderItem.objects.bulk_create(items, batch_size=batch_size)
+        Order.objects.bulk_update(order_rows, ['subtotal', 'total'], batch_size=batch_size)
+        # Nothing else writes while seeding, so today's rows can be rebuilt too
+        rebuild_rollups([seller.pk for seller in seller_rows], until=timezone.localdate() + timedelta(days=1))
+
+    with connection.cursor() as cursor:
+        # Fresh statistics, so the planner sees the real table sizes
+        cursor.execute('ANALYZE')
+    return {'sellers': seller_rows, 'buyers': buyer_users, 'categories': category_rows, 'products': product_rows,
+            'orders': order_rows}
@@ -1,21 +1,22 @@
 from rest_framework import serializers
-from drf_spectacular.utils import extend_schema_field
 
 from ..common.utils import UpdateMixin
 from ..sellers.serializers import SellerSerializer
 from ..profiles.serializers import ShippingAddressSerializer
-from ..common.serializers import DymanicFieldSerializer
-from .models import Review, Category
+from ..common.serializers import DymanicFieldSerializer, RenditionsField, rendition_urls
+from .models import Review, Category, Product
 
 
 class CategorySerializer(serializers.ModelSerializer):
     # name = serializers.CharField()
     # slug = serializers.SlugField(read_only=True)
     # image = serializers.ImageField(required=False)
+    renditions = RenditionsField()
+
     class Meta:
         model = Category
-        fields = ['name', 'slug', 'image']
-        read_only_fields = ['slug']
+        fields = ['name', 'slug', 'image', 'renditions']
+        read_only_fields = ['slug', 'renditions']
         extra_kwargs = {
             'name': {'required': True},
             'image': {'required': False}
@@ -26,6 +27,7 @@ class SellerShopSerializer(serializers.Serializer):
     name = serializers.CharField(source="business_name")
     slug = serializers.CharField()
     avatar = serializers.CharField(source="user.avatar")
+    avatar_renditions = RenditionsField(source="user.renditions")
 
 
 class ProductSerializer(DymanicFieldSerializer):
@@ -37,11 +39,144 @@ class ProductSerializer(DymanicFieldSerializer):
     price_current = serializers.DecimalField(max_digits=10, decimal_places=2)
     category = CategorySerializer()
     in_stock = serializers.IntegerField()
-    reviews = serializers.IntegerField(source='get_reviews_count')
-    rating = serializers.DecimalField(max_digits=2, decimal_places=1, source="get_rating")
+    reviews = serializers.IntegerField(source='reviews_count')
+    rating = serializers.DecimalField(max_digits=2, decimal_places=1, source="rating_avg")
     image1 = serializers.ImageField()
     image2 = serializers.ImageField(required=False)
     image3 = serializers.ImageField(required=False)
+    renditions = RenditionsField()
+
+
+class ProductListSerializer(serializers.BaseSerializer):
+    """
+    Read-only ProductSerializer for product lists. Serializes the rows of project(),
+    which selects only the columns the representation needs across the category
+    and seller joins, into the same dicts without building model instances or
+    running nested serializers. Takes the `fields` and `exclude_fields` arguments
+    of DymanicFieldSerializer, project() then selects only the columns of the
+    fields left. `check_product_projection` compares the output of both serializers.
+    """
+    # Fields of the representation in ProductSerializer's order, and the columns each is built from
+    field_columns = {
+        'seller': ('seller_id', 'seller__business_name', 'seller__slug', 'seller__user__avatar',
+                   'seller__user__renditions'),
+        'name': ('name',),
+        'slug': ('slug',),
+        'description': ('description',),
+        'price_old': ('price_old',),
+        'price_current': ('price_current',),
+        'category': ('category__name', 'category__slug', 'category__image', 'category__renditions'),
+        'in_stock': ('in_stock',),
+        'reviews': ('reviews_count',),
+        'rating': ('rating_avg',),
+        'image1': ('image1',),
+        'image2': ('image2',),
+        'image3': ('image3',),
+        'renditions': ('renditions',),
+    }
+    # Numbers are formatted by the fields of ProductSerializer
+    price_field = ProductSerializer._declared_fields['price_current']
+    rating_field = ProductSerializer._declared_fields['rating']
+    product_storage = Product._meta.get_field('image1').storage
+    category_storage = Category._meta.get_field('image').storage
+
+    def __init__(self, *args, **kwargs):
+        self.field_names = self.get_field_names(kwargs.pop('fields', None), kwargs.pop('exclude_fields', None))
+        super().__init__(*args, **kwargs)
+        self.builders = [(name, getattr(self, f'build_{name}')) for name in self.field_names]
+
+    @classmethod
+    def get_field_names(cls, fields=None, exclude_fields=None):
+        return [name for name in cls.field_columns
+                if (fields is None or name in fields) and name not in (exclude_fields or ())]
+
+    @classmethod
+    def project(cls, queryset, fields=None, exclude_fields=None):
+        """
+        Named rows of `queryset` with the columns of the representation, and the
+        ones it's ordered by, which cursor pagination reads positions from.
+        """
+        columns = ['id']
+        for name in cls.get_field_names(fields, exclude_fields):
+            columns += [column for column in cls.field_columns[name] if column not in columns]
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        columns += [name for name in (field.lstrip('-') for field in ordering if isinstance(field, str))
+                    if name not in columns and name != 'pk']
+        return queryset.values_list(*columns, named=True)
+
+    @staticmethod
+    def file_url(storage, name, request):
+        # Same as ImageField.to_representation()
+        if not name:
+            return None
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    @staticmethod
+    def decimal(field, value):
+        return None if value is None else field.to_representation(value)
+
+    @staticmethod
+    def renditions(value, request):
+        return None if value is None else rendition_urls(value, request)
+
+    def to_representation(self, row):
+        request = self.context.get('request')
+        return {name: build(row, request) for name, build in self.builders}
+
+    def build_seller(self, row, request):
+        if row.seller_id is None:
+            return None
+        return {
+            'name': row.seller__business_name,
+            'slug': row.seller__slug,
+            'avatar': row.seller__user__avatar or '',
+            'avatar_renditions': self.renditions(row.seller__user__renditions, request),
+        }
+
+    def build_name(self, row, request):
+        return row.name
+
+    def build_slug(self, row, request):
+        return row.slug
+
+    def build_description(self, row, request):
+        return row.description
+
+    def build_price_old(self, row, request):
+        return self.decimal(self.price_field, row.price_old)
+
+    def build_price_current(self, row, request):
+        return self.decimal(self.price_field, row.price_current)
+
+    def build_category(self, row, request):
+        return {
+            'name': row.category__name,
+            'slug': row.category__slug,
+            'image': self.file_url(self.category_storage, row.category__image, request),
+            'renditions': self.renditions(row.category__renditions, request),
+        }
+
+    def build_in_stock(self, row, request):
+        return row.in_stock
+
+    def build_reviews(self, row, request):
+        return row.reviews_count
+
+    def build_rating(self, row, request):
+        return self.decimal(self.rating_field, row.rating_avg)
+
+    def build_image1(self, row, request):
+        return self.file_url(self.product_storage, row.image1, request)
+
+    def build_image2(self, row, request):
+        return self.file_url(self.product_storage, row.image2, request)
+
+    def build_image3(self, row, request):
+        return self.file_url(self.product_storage, row.image3, request)
+
+    def build_renditions(self, row, request):
+        return self.renditions(row.renditions, request)
 
 
 class CreateProductSerializer(UpdateMixin, serializers.Serializer):
@@ -55,6 +190,13 @@ class CreateProductSerializer(UpdateMixin, serializers.Serializer):
     image3 = serializers.ImageField(required=False)
 
 
+# Строка массового импорта: изображения передаются путями к уже загруженным в MEDIA_ROOT файлам
+class BulkProductSerializer(CreateProductSerializer):
+    image1 = serializers.CharField(max_length=100)
+    image2 = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    image3 = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+
 # Используется для представления информации о продукте внутри элемента заказа
 class OrderItemProductSerializer(serializers.Serializer):
     seller = SellerSerializer()
@@ -77,11 +219,22 @@ class ToggleCartItemSerializer(serializers.Serializer):
     quantity = serializers.IntegerField(min_value=0)
 
 
+# Несколько строк корзины за один запрос, каждый товар не больше одного раза
+class BatchCartSerializer(serializers.Serializer):
+    items = ToggleCartItemSerializer(many=True, allow_empty=False, max_length=100)
+
+    def validate_items(self, items):
+        slugs = [item['slug'] for item in items]
+        if len(slugs) != len(set(slugs)):
+            raise serializers.ValidationError("Every product can be listed only once")
+        return items
+
+
 class CheckoutSerializer(serializers.Serializer):
     shipping_id = serializers.UUIDField()
 
 
-class OrderSerializer(serializers.Serializer):
+class OrderSerializer(DymanicFieldSerializer):
     tx_ref = serializers.CharField()
     first_name = serializers.CharField(source="user.first_name")
     last_name = serializers.CharField(source="user.last_name")
@@ -89,13 +242,23 @@ class OrderSerializer(serializers.Serializer):
     delivery_status = serializers.CharField()
     payment_status = serializers.CharField()
     date_delivered = serializers.DateTimeField()
-    shipping_details = serializers.SerializerMethodField()
-    subtotal = serializers.DecimalField(max_digits=100, decimal_places=2, source="get_cart_subtotal")
-    total = serializers.DecimalField(max_digits=100, decimal_places=2, source="get_cart_total")
+    # The shipping address is copied into the order
+    shipping_details = ShippingAddressSerializer(source='*', read_only=True)
+    subtotal = serializers.DecimalField(max_digits=100, decimal_places=2)
+    total = serializers.DecimalField(max_digits=100, decimal_places=2)
 
-    @extend_schema_field(ShippingAddressSerializer)
-    def get_shipping_details(self, obj):
-        return ShippingAddressSerializer(obj).data
+
+class SellerOrderSerializer(DymanicFieldSerializer):
+    tx_ref = serializers.CharField(source="order.tx_ref")
+    first_name = serializers.CharField(source="order.user.first_name")
+    last_name = serializers.CharField(source="order.user.last_name")
+    email = serializers.EmailField(source="order.user.email")
+    delivery_status = serializers.CharField()
+    payment_status = serializers.CharField(source="order.payment_status")
+    date_delivered = serializers.DateTimeField(source="order.date_delivered")
+    shipping_details = ShippingAddressSerializer(source='order', read_only=True)
+    subtotal = serializers.DecimalField(max_digits=100, decimal_places=2)
+    item_count = serializers.IntegerField()
 
 
 class CheckItemOrderSerializer(serializers.Serializer):
@@ -0,0 +1,110 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from ..accounts.models import User
+from ..common.cache import invalidate
+from ..common.images import register_renditions
+from ..sellers.models import Seller
+from .cache import (CATEGORIES_SCOPE, SELLERS_SCOPE, invalidate_catalog, invalidate_product_renditions,
+                    invalidate_products, product_scopes, seller_scope)
+from .models import Category, Product, Review
+
+
+# Fields of a seller nested in every product representation, see serializers.SellerShopSerializer
+SELLER_LIST_FIELDS = ('business_name', 'slug')
+USER_LIST_FIELDS = ('avatar', 'renditions')
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_delete, sender=Product)
+def remember_product_scopes(sender, instance, **kwargs):
+    # Pages of the category/seller the product is moved away from are stale as well
+    if not instance._state.adding:
+        instance._old_cache_scopes = product_scopes([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product(sender, instance, **kwargs):
+    scopes = getattr(instance, '_old_cache_scopes', set()) | product_scopes([instance.pk])
+    invalidate(*scopes)
+
+
+@receiver(pre_delete, sender=Review)
+def remove_review_rating(sender, instance, origin=None, **kwargs):
+    # Reviews deleted along with their product, directly or through its category, leave no rating to update
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if not instance.is_deleted and origin_model not in (Product, Category):
+        instance.product.apply_review_change(-(instance.rating or 0), -1, review=instance)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_product(sender, instance, **kwargs):
+    invalidate_products([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, instance, **kwargs):
+    invalidate(CATEGORIES_SCOPE)
+
+
+def remember_list_fields(model, instance, field_names, update_fields):
+    if instance._state.adding or (update_fields is not None and not set(update_fields) & set(field_names)):
+        instance._old_list_fields = None
+        return
+    instance._old_list_fields = model._base_manager.filter(pk=instance.pk).values(*field_names).first()
+
+
+def list_fields_changed(instance, field_names):
+    old = instance.__dict__.pop('_old_list_fields', None)
+    return old is not None and any(old[name] != getattr(instance, name) for name in field_names)
+
+
+@receiver(pre_save, sender=Seller)
+def remember_seller_list_fields(sender, instance, update_fields=None, **kwargs):
+    remember_list_fields(Seller, instance, SELLER_LIST_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=Seller)
+def invalidate_seller(sender, instance, **kwargs):
+    old = instance.__dict__.get('_old_list_fields')
+    scopes = {seller_scope(instance.slug)}
+    if list_fields_changed(instance, SELLER_LIST_FIELDS):
+        scopes.update((SELLERS_SCOPE, seller_scope(old['slug'])))
+    invalidate(*scopes)
+
+
+@receiver(post_delete, sender=Seller)
+def invalidate_deleted_seller(sender, instance, **kwargs):
+    # Products of a deleted seller stay listed without it
+    invalidate(SELLERS_SCOPE, seller_scope(instance.slug))
+
+
+@receiver(pre_save, sender=User)
+def remember_avatar(sender, instance, update_fields=None, **kwargs):
+    if instance.account_type == 'SELLER':
+        remember_list_fields(User, instance, USER_LIST_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=User)
+def invalidate_seller_avatar(sender, instance, **kwargs):
+    # Logins and profile edits save users all the time, product pages only show the avatar
+    if list_fields_changed(instance, USER_LIST_FIELDS):
+        invalidate(SELLERS_SCOPE)
+
+
+def invalidate_category_renditions(pk):
+    # Categories are nested in every product representation
+    invalidate_catalog()
+
+
+def invalidate_avatar_renditions(pk):
+    invalidate(SELLERS_SCOPE)
+
+
+register_renditions(Product, Product.IMAGE_FIELDS, invalidate_product_renditions)
+register_renditions(Category, Category.IMAGE_FIELDS, invalidate_category_renditions)
+register_renditions(User, User.IMAGE_FIELDS, invalidate_avatar_renditions)
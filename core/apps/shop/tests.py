@@ -1,3 +1,214 @@
-from django.test import TestCase
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from ..accounts.models import User
+from ..profiles.models import Order, OrderItem, ShippingAddress
+from ..sellers.models import Seller
+from .cart import MemoryCartStore, cart_items, get_cart_store
+from .filters import ProductFilter
+from .models import Category, Product, Review
+from .search import SQLITE_TRIGGERS, restore_sqlite_triggers
+from .serializers import ProductListSerializer, ProductSerializer
+
+
+class SharedMemoryCartStore(MemoryCartStore):
+    shared = True
+
+
+def make_catalog(products=3, in_stock=5):
+    user = User.objects.create_user('Seller', 'User', 'seller@example.com', 'password', account_type='SELLER')
+    seller = Seller.objects.create(user=user, business_name='Shop', inn_number='1', phone_number='1',
+                                   business_description='d', business_address='a', city='c', postal_code='1',
+                                   bank_name='b', bic_bank_number='1', bank_account_number='1',
+                                   bank_routing_number='1', is_approved=True)
+    category = Category.objects.create(name='Phones', image='category_images/phones.jpg')
+    return [Product.objects.create(seller=seller, name=f'Phone {i}', description='d', category=category,
+                                   price_current=Decimal('10.00') + i, in_stock=in_stock,
+                                   image1='product_images/phone.jpg')
+            for i in range(products)]
+
+
+class ShopTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_cart_store.cache_clear()
+        self.products = make_catalog()
+        self.buyer = User.objects.create_user('Buyer', 'User', 'buyer@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def tearDown(self):
+        get_cart_store.cache_clear()
+
+
+class CartTests(ShopTestCase):
+    def toggle(self, product, quantity):
+        return self.client.post('/shop/cart/', {'slug': product.slug, 'quantity': quantity}, format='json')
+
+    def cart(self):
+        return {item['product']['slug']: item['quantity'] for item in self.client.get('/shop/cart/').json()}
+
+    def test_add_update_remove(self):
+        product = self.products[0]
+        response = self.toggle(product, 1)
+        self.assertEqual((response.status_code, response.json()['message']), (201, "Item Added To Cart"))
+        response = self.toggle(product, 2)
+        self.assertEqual((response.status_code, response.json()['message']), (200, "Item Updated In Cart"))
+        self.assertEqual(self.cart(), {product.slug: 2})
+        response = self.toggle(product, 0)
+        self.assertEqual(response.json(), {'message': "Item Removed From Cart", 'item': None})
+        self.assertEqual(self.cart(), {})
+
+    def test_cart_stays_out_of_the_database(self):
+        self.toggle(self.products[0], 1)
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_quantity_over_stock_is_rejected(self):
+        self.assertEqual(self.toggle(self.products[0], 6).status_code, 400)
+        self.assertEqual(self.cart(), {})
+
+    def test_move_carts_refuses_process_store(self):
+        OrderItem.objects.create(user=self.buyer, product=self.products[0], quantity=2)
+        with self.assertRaises(CommandError):
+            call_command('move_carts_to_store')
+        self.assertEqual(OrderItem.objects.filter(order=None).count(), 1)
+
+    @override_settings(CART_BACKEND='apps.shop.tests.SharedMemoryCartStore')
+    def test_move_carts_to_shared_store(self):
+        get_cart_store.cache_clear()
+        OrderItem.objects.create(user=self.buyer, product=self.products[0], quantity=2)
+        call_command('move_carts_to_store', stdout=StringIO())
+        self.assertFalse(OrderItem.objects.filter(order=None).exists())
+        self.assertEqual(get_cart_store().get(self.buyer.id), {str(self.products[0].id): 2})
+
+
+class ResponseCacheTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def test_json_is_cached_and_revalidated(self):
+        response = self.client.get('/shop/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        response = self.client.get('/shop/products/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        response = self.client.get('/shop/products/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_browsable_api_is_not_cached(self):
+        self.client.get('/shop/categories/')
+        for _ in range(2):
+            response = self.client.get('/shop/categories/', HTTP_ACCEPT='text/html')
+            self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+            self.assertNotIn('X-Cache', response)
+            self.assertNotIn('ETag', response)
+
+    def test_cached_responses_are_authenticated(self):
+        self.assertEqual(self.client.get('/shop/products/').status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer invalid')
+        self.assertEqual(self.client.get('/shop/products/').status_code, 401)
+
+
+class SellerCacheTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.seller = self.products[0].seller
+        self.paths = ['/shop/products/', f'/shop/products/seller/{self.seller.slug}']
+
+    def hits_after(self, change):
+        for path in self.paths:
+            self.client.get(path)
+        with mock.patch('apps.common.images.schedule_renditions'), self.captureOnCommitCallbacks(execute=True):
+            change()
+        return [self.client.get(path)['X-Cache'] == 'HIT' for path in self.paths]
+
+    def test_user_saves_keep_product_lists(self):
+        user = self.seller.user
+
+        def change():
+            user.last_login = timezone.now()
+            user.save(update_fields=['last_login'])
+            user.first_name = 'Renamed'
+            user.save()
+        self.assertEqual(self.hits_after(change), [True, True])
+
+    def test_seller_edits_expire_only_its_page(self):
+        self.seller.business_description = 'Lamps too'
+        self.assertEqual(self.hits_after(self.seller.save), [True, False])
+
+    def test_shown_seller_fields_expire_product_lists(self):
+        self.seller.business_name = 'Lamp Shop'
+        self.assertEqual(self.hits_after(self.seller.save), [False, False])
+        self.seller.user.avatar = 'avatars/lamp.jpg'
+        self.assertEqual(self.hits_after(self.seller.user.save), [False, False])
+
+
+@mock.patch('apps.shop.bulk.schedule_renditions')
+class BulkImportTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seller = self.products[0].seller
+        self.client.force_authenticate(self.seller.user)
+
+    def upload(self, *rows):
+        lines = ['name,description,price_current,category_slug,in_stock,image1']
+        lines += [','.join(row) for row in rows]
+        file = SimpleUploadedFile('products.csv', '\n'.join(lines).encode(), content_type='text/csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/sellers/products/bulk/', {'file': file}, format='multipart')
+
+    def row(self, name, price='9.99'):
+        return name, 'Imported', price, self.products[0].category.slug, '3', 'product_images/lamp.jpg'
+
+    def test_valid_import(self, schedule_renditions):
+        response = self.upload(self.row('Desk lamp'), self.row('Floor lamp'))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json(), {'created': 2, 'errors': []})
+        lamps = Product.objects.filter(name__endswith='lamp').order_by('name')
+        self.assertEqual([(lamp.slug, lamp.seller_id, lamp.in_stock) for lamp in lamps],
+                         [('desk-lamp', self.seller.id, 3), ('floor-lamp', self.seller.id, 3)])
+        self.assertEqual(schedule_renditions.call_count, 2)
+
+    def test_invalid_row_rolls_back_the_import(self, schedule_renditions):
+        response = self.upload(self.row('Desk lamp'), self.row('Floor lamp', price='cheap'),
+                               self.row('Wall lamp'), ('Bad', 'x', '1', 'missing', '1', 'y'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], 0)
+        self.assertEqual([error['row'] for error in response.json()['errors']], [2, 4])
+        self.assertFalse(Product.objects.filter(name__endswith='lamp').exists())
+        schedule_renditions.assert_not_called()
+
+    def test_colliding_slugs_are_reserved(self, schedule_renditions):
+        existing = self.products[0]
+        response = self.upload(self.row(existing.name), self.row(existing.name))
+        self.assertEqual(response.status_code, 201, response.content)
+        slugs = set(Product.objects.filter(name=existing.name).values_list('slug', flat=True))
+        self.assertEqual(slugs, {existing.slug, f'{existing.slug}-2', f'{existing.slug}-3'})
+
+    def test_caches_and_search_see_imported_products(self, schedule_renditions):
+        anonymous = APIClient()
+        paths = ['/shop/products/', f'/shop/products/category/{self.products[0].category.slug}',
+                 f'/shop/products/seller/{self.seller.slug}']
+        for path in paths:
+            self.assertEqual(anonymous.get(path).status_code, 200)
+            self.assertEqual(anonymous.get(path)['X-Cache'], 'HIT')
+        self.upload(self.row('Desk lamp'))
+        for path in paths:
+            with self.subTest(path=path):
+                response = anonymous.get(path)
+                self.assertEqual(response['X-Cache'], 'MISS')
+                self.assertIn('desk-lamp', response.content.decode())
+        self.assertEqual([product.slug for product in ProductFilter(data={'search': 'desk'},
+                                                                    queryset=Product.objects.all()).qs],
+                         ['desk-lamp'])
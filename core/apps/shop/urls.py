@@ -14,6 +14,7 @@ urlpatterns = [
     path('products/<slug:prod_slug>', views.ProductView.as_view(), name='product'),
     path('reviews/<slug:prod_slug>', views.ProductReview.as_view()),
     path('cart/', views.CartView.as_view()),
+    path('cart/batch/', views.CartBatchView.as_view()),
     path('checkout/', views.CheckoutView.as_view()),
 
 ]
\ No newline at end of file
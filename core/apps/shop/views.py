@@ -1,5 +1,9 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, F, Q, When
 from rest_framework.views import APIView
-from rest_framework.generics import ListAPIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
@@ -9,11 +13,22 @@ from django_filters.rest_framework import DjangoFilterBackend
 from . import serializers
 from .models import Category, Product, Review
 from ..sellers.models import Seller
-from ..profiles.models import Order, OrderItem, ShippingAddress
+from ..sellers.analytics import record_checkout
+from ..profiles.models import Order, OrderItem, SellerOrder, ShippingAddress
 from .filters import ProductFilter, ReviewFilter
 from ..common.permissions import IsOwner, IsStaff
 from ..common.paginations import CustomNumberPagination
-from .schema_examples import PRODUCT_PARAMS, REVIEWS_PARAMS
+from ..common.cache import CachedResponseMixin
+from ..common.conditional import make_etag, not_modified, queryset_validators
+from ..common.streaming import StreamingListMixin
+from ..common.views import AsyncAPIView, AsyncListAPIView
+from ..common.timing import ServerTimingMixin
+from ..common.fieldsets import FIELDSET_PARAMS, FieldsetMixin, prune_queryset, requested_fieldset
+from .cart import cart_items, get_cart_store
+from .categories import aget_category, get_categories
+from .cache import (CATALOG_SCOPE, CATEGORIES_SCOPE, PRODUCTS_SCOPE, SELLERS_SCOPE, category_scope,
+                    invalidate_products, product_scope, seller_scope)
+from .schema_examples import PRODUCT_PARAMS, REVIEWS_PARAMS, STREAM_PARAMS
 
 shop_tag = ['Shop']
 cart_checkout_tag = ['Cart & Checkout']
@@ -41,89 +56,150 @@ cart_checkout_tag = ['Cart & Checkout']
         tags=shop_tag
     )
 )
-class CategoriesView(ModelViewSet):
+class CategoriesView(ServerTimingMixin, CachedResponseMixin, ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = serializers.CategorySerializer
     permission_classes = [IsStaff]
     lookup_field = 'slug'
     lookup_url_kwarg = 'cat_slug'
 
+    def get_cache_scopes(self, request, *args, **kwargs):
+        return [CATALOG_SCOPE, CATEGORIES_SCOPE]
 
-@extend_schema_view(
-    get=extend_schema(
+    def list(self, request, *args, **kwargs):
+        # Served from the per-process snapshot, see categories.py
+        categories = get_categories().categories
+        page = self.paginate_queryset(categories)
+        data = [category.to_representation(request) for category in (categories if page is None else page)]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class ProductListMixin(FieldsetMixin):
+    """
+    Serves product lists with ProductListSerializer from projected rows, limited to
+    the fields asked for with `?fields=` and `?exclude=`. The schema is still
+    generated from serializer_class.
+    """
+
+    def get_serializer_class(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return self.serializer_class
+        return serializers.ProductListSerializer
+
+    def prune_queryset(self, queryset):
+        return serializers.ProductListSerializer.project(queryset, **self.get_fieldset())
+
+    def stream_response(self, queryset, stream_format, serializer_class=None, **serializer_kwargs):
+        return super().stream_response(queryset, stream_format, serializer_class, **self.get_fieldset(),
+                                       **serializer_kwargs)
+
+
+class ListProductView(ServerTimingMixin, ProductListMixin, CachedResponseMixin, StreamingListMixin,
+                      AsyncListAPIView):
+    queryset = Product.objects.all()
+    serializer_class = serializers.ProductSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ProductFilter
+    pagination_class = CustomNumberPagination
+
+    def get_cache_scopes(self, request, *args, **kwargs):
+        return [CATALOG_SCOPE, CATEGORIES_SCOPE, SELLERS_SCOPE, PRODUCTS_SCOPE]
+
+    # Declared here and not with @extend_schema_view, which would wrap get() in a sync function
+    @extend_schema(
         operation_id="all_products",
         summary="All Products Fetch",
         description="""This endpoint returns all products.""",
         tags=shop_tag,
         parameters=PRODUCT_PARAMS,
     )
-)
-class ListProductView(ListAPIView):
-    queryset = Product.objects.select_related("category", "seller__user").prefetch_related('reviews')
-    serializer_class = serializers.ProductSerializer
-    filter_backends = [DjangoFilterBackend]
-    filterset_class = ProductFilter
-    pagination_class = CustomNumberPagination
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
 
 
-class ProductByCategoryView(APIView):
+class ProductByCategoryView(ServerTimingMixin, CachedResponseMixin, StreamingListMixin, AsyncAPIView):
     serializer_class = serializers.ProductSerializer
 
+    def get_cache_scopes(self, request, *args, **kwargs):
+        return [CATALOG_SCOPE, CATEGORIES_SCOPE, SELLERS_SCOPE, category_scope(kwargs['cat_slug'])]
+
     @extend_schema(
         operation_id="category_products",
         summary="Products Fetch by Category",
-        description="""This endpoint returns all products in a particular category.""",
-        tags=shop_tag
+        description="""This endpoint returns all products in a particular category.
+                        Large categories can be streamed as NDJSON or a JSON array with `stream`.""",
+        tags=shop_tag,
+        parameters=[*STREAM_PARAMS, *FIELDSET_PARAMS],
     )
-    def get(self, request, *args, **kwargs):
-        category = Category.objects.get_or_none(slug=kwargs['cat_slug'])
+    async def get(self, request, *args, **kwargs):
+        stream_format = self.get_stream_format(request)
+        fieldset = requested_fieldset(request, self.serializer_class._declared_fields)
+        category = await aget_category(kwargs['cat_slug'])
         if not category:
             return Response(data={"message": "Category does not exist!"}, status=404)
-        products = Product.objects.select_related('category', 'seller__user').filter(category=category)
-        serializer = self.serializer_class(products, many=True)
+        products = serializers.ProductListSerializer.project(Product.objects.filter(category_id=category.id),
+                                                             **fieldset)
+        if stream_format:
+            return self.stream_response(products, stream_format, serializer_class=serializers.ProductListSerializer,
+                                        **fieldset)
+        serializer = serializers.ProductListSerializer([product async for product in products], many=True,
+                                                       **fieldset)
         return Response(data=serializer.data, status=200)
 
 
-@extend_schema_view(
-    get=extend_schema(
-        operation_id="seller_products",
-        summary="Products Fetch by Seller",
-        description="""This endpoint returns all products of a seller.""",
-        tags=shop_tag,
-        parameters=PRODUCT_PARAMS
-    )
-)
-class ProductBySellerView(ListAPIView):
+class ProductBySellerView(ServerTimingMixin, ProductListMixin, CachedResponseMixin, StreamingListMixin,
+                          AsyncListAPIView):
+    queryset = Product.objects.all()
     serializer_class = serializers.ProductSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProductFilter
     pagination_class = CustomNumberPagination
 
-    def get_queryset(self):
-        seller = Seller.objects.get_or_none(slug=self.kwargs.get('seller_slug'))
+    def get_cache_scopes(self, request, *args, **kwargs):
+        return [CATALOG_SCOPE, CATEGORIES_SCOPE, SELLERS_SCOPE, seller_scope(kwargs['seller_slug'])]
+
+    async def aget_queryset(self):
+        seller = await Seller.objects.aget_or_none(slug=self.kwargs.get('seller_slug'))
         if not seller:
             raise ValidationError("Seller doesn't exist")
-        return Product.objects.select_related('category', 'seller__user').filter(seller=seller)
+        return self.get_queryset().filter(seller=seller)
+
+    @extend_schema(
+        operation_id="seller_products",
+        summary="Products Fetch by Seller",
+        description="""This endpoint returns all products of a seller.""",
+        tags=shop_tag,
+        parameters=PRODUCT_PARAMS
+    )
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
 
 
-class ProductView(APIView):
+class ProductView(ServerTimingMixin, CachedResponseMixin, AsyncAPIView):
     serializer_class = serializers.ProductSerializer
 
+    def get_cache_scopes(self, request, *args, **kwargs):
+        return [CATALOG_SCOPE, CATEGORIES_SCOPE, SELLERS_SCOPE, product_scope(kwargs['prod_slug'])]
+
     @extend_schema(
         operation_id="product_detail",
         summary="Product Details Fetch",
         description="""This endpoint returns the details for a product via the slug.""",
-        tags=shop_tag
+        tags=shop_tag,
+        parameters=FIELDSET_PARAMS,
     )
-    def get(self, request, *args, **kwargs):
-        product = Product.objects.select_related('category', 'seller__user').get_or_none(slug=kwargs['prod_slug'])
+    async def get(self, request, *args, **kwargs):
+        serializer = self.serializer_class(**requested_fieldset(request, self.serializer_class._declared_fields))
+        product = await prune_queryset(Product.objects.all(), serializer).aget_or_none(slug=kwargs['prod_slug'])
         if not product:
             raise ValidationError("Seller doesn't exist")
-        serializer = self.serializer_class(instance=product)
+        serializer.instance = product
         return Response(data=serializer.data, status=200)
 
 
-class CartView(APIView):
+class CartView(ServerTimingMixin, APIView):
     serializer_class = serializers.OrderItemSerializer
     permission_classes = [IsOwner]
 
@@ -133,8 +209,7 @@ class CartView(APIView):
         tags=cart_checkout_tag,
     )
     def get(self, request, *args, **kwargs):
-        user = request.user
-        order_items = OrderItem.objects.filter(user=user, order=None).select_related("product__seller__user")
+        order_items = cart_items(request.user)
         serializer = self.serializer_class(order_items, many=True)
         return Response(data=serializer.data, status=200)
 
@@ -156,12 +231,8 @@ class CartView(APIView):
             return Response({"message": "No Product with that slug"}, status=404)
         if quantity > product.in_stock:
             return Response({"message": f"There is only {product.in_stock} of {product.name} in stock"}, status=400)
-        order_item, created = OrderItem.objects.update_or_create(
-            user=user,
-            order_id=None,
-            product=product,
-            defaults={"quantity": quantity},
-        )
+        created = get_cart_store().set(user.id, product.id, quantity)
+        order_item = OrderItem(user=user, product=product, quantity=quantity)
         resp_message_substring = "Updated In"
         status_code = 200
         if created:
@@ -169,7 +240,6 @@ class CartView(APIView):
             resp_message_substring = "Added To"
         if order_item.quantity == 0:
             resp_message_substring = "Removed From"
-            order_item.delete()
             data = None
         if resp_message_substring != "Removed From":
             serializer = self.serializer_class(order_item)
@@ -177,7 +247,50 @@ class CartView(APIView):
         return Response(data={"message": f"Item {resp_message_substring} Cart", "item": data}, status=status_code)
 
 
-class CheckoutView(APIView):
+class CartBatchView(ServerTimingMixin, APIView):
+    serializer_class = serializers.OrderItemSerializer
+    permission_classes = [IsOwner]
+
+    @extend_schema(
+        summary="Toggle several items in cart",
+        description="""This endpoint adds/updates/removes up to 100 cart items at once.
+                        Nothing is changed unless every item is valid, the response has a result per item""",
+        tags=cart_checkout_tag,
+        request=serializers.BatchCartSerializer,
+    )
+    def post(self, request, *args, **kwargs):
+        user = request.user
+        serializer = serializers.BatchCartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lines = serializer.validated_data["items"]
+        products = Product.objects.select_related("seller__user").in_bulk(
+            [line["slug"] for line in lines], field_name="slug")
+        errors = []
+        for line in lines:
+            product = products.get(line["slug"])
+            if not product:
+                errors.append({"slug": line["slug"], "message": "No Product with that slug"})
+            elif line["quantity"] > product.in_stock:
+                errors.append({"slug": line["slug"],
+                               "message": f"There is only {product.in_stock} of {product.name} in stock"})
+        if errors:
+            return Response({"message": "No items were changed", "errors": errors}, status=400)
+        # A single store write, so the whole batch is applied or nothing is
+        added = get_cart_store().update(user.id, {products[line["slug"]].id: line["quantity"] for line in lines})
+        results = []
+        for line in lines:
+            product = products[line["slug"]]
+            if not line["quantity"]:
+                results.append({"slug": product.slug, "message": "Item Removed From Cart", "item": None})
+                continue
+            order_item = OrderItem(user=user, product=product, quantity=line["quantity"])
+            resp_message_substring = "Added To" if str(product.id) in added else "Updated In"
+            results.append({"slug": product.slug, "message": f"Item {resp_message_substring} Cart",
+                            "item": self.serializer_class(order_item).data})
+        return Response(data={"message": "Cart Updated", "items": results}, status=200)
+
+
+class CheckoutView(ServerTimingMixin, APIView):
     serializer_class = serializers.CheckoutSerializer
     permission_classes = [IsOwner]
 
@@ -187,16 +300,20 @@ class CheckoutView(APIView):
         tags=cart_checkout_tag,
         request=serializers.CheckoutSerializer,
     )
+    @transaction.atomic
     def post(self, request):
         # Proceed to checkout
         user = request.user
-        order_items = OrderItem.objects.select_related('product').filter(user=user, order=None)
-        if not order_items.exists():
+        order_items = cart_items(user, for_update=True)
+        if not order_items:
             return Response({"message": "No Items in Cart"}, status=404)
+        quantities = {item.product_id: item.quantity for item in order_items}
+        products = [item.product for item in order_items]
         quantity_validate_dct = {}
-        for item in order_items:
-            if item.quantity > item.get_in_stock:
-                quantity_validate_dct[item.product.name] = item.get_in_stock
+        for product in products:
+            in_stock = 0 if product.is_deleted else product.in_stock
+            if quantities[product.id] > in_stock:
+                quantity_validate_dct[product.name] = in_stock
         if quantity_validate_dct:
             message = 'Please reduce the amount of the following products:\n' + \
                       '\n'.join(f'{k} in stock - {v}' for k, v in quantity_validate_dct.items())
@@ -204,20 +321,33 @@ class CheckoutView(APIView):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         shipping_id = serializer.validated_data.get("shipping_id")
-        if shipping_id:
-            address = ShippingAddress.objects.get_or_none(id=shipping_id)
-            if not address:
-                return Response({"message": "No shipping address with that ID"}, status=404)
+        address = ShippingAddress.objects.get_or_none(id=shipping_id)
+        if not address:
+            return Response({"message": "No shipping address with that ID"}, status=404)
         fields_to_update = ["full_name", "email", "phone", "address", "city", "country", "zipcode"]
         data = {}
         for field in fields_to_update:
             value = getattr(address, field)
             data[field] = value
-        order = Order.objects.create(user=user, **data)
+        prices = {product.id: product.price_current for product in products}
         for item in order_items:
-            item.product.in_stock -= item.quantity
-            item.product.save()
-        order_items.update(order=order)
+            item.set_purchase_price(prices[item.product_id])
+        subtotal = sum(item.line_total for item in order_items)
+        order = Order.objects.create(user=user, subtotal=subtotal, total=subtotal, **data)
+        # Decrement the whole cart with a single UPDATE, rows that would go negative are skipped
+        enough_stock = reduce(or_, (Q(id=pk, in_stock__gte=qty) for pk, qty in quantities.items()))
+        in_stock = Case(*(When(id=pk, then=F('in_stock') - qty) for pk, qty in quantities.items()),
+                        default=F('in_stock'))
+        if Product.objects.filter(enough_stock).update(in_stock=in_stock) != len(quantities):
+            transaction.set_rollback(True)
+            return Response({"message": "Stock has changed, please try again"}, status=409)
+        invalidate_products(quantities)
+        for item in order_items:
+            item.order = order
+        seller_orders = SellerOrder.objects.bulk_create(SellerOrder.split(order, order_items))
+        OrderItem.objects.bulk_create(order_items)
+        record_checkout(seller_orders, order_items)
+        transaction.on_commit(lambda: get_cart_store().remove(user.id, quantities))
         serializer = serializers.OrderSerializer(order)
         return Response(data={"message": "Checkout Successful", "item": serializer.data}, status=200)
 
@@ -244,7 +374,7 @@ class CheckoutView(APIView):
         tags=shop_tag,
     ),
 )
-class ProductReview(APIView):
+class ProductReview(ServerTimingMixin, APIView):
     serializer_class = serializers.CreateReviewSerializer
     pagination_class = CustomNumberPagination
 
@@ -256,38 +386,57 @@ class ProductReview(APIView):
 
     def get(self, request, *args, **kwargs):
         product = self.get_object(**kwargs)
-        reviews = product.reviews.select_related('user')
+        # The product's name and rating are in the page too, reviewers' names come from their accounts
+        etag = make_etag(request, {
+            'product': (product.updated_at, product.rating_avg, product.reviews_count),
+            **queryset_validators(Review.objects.filter(product=product), 'updated_at', 'user__updated_at'),
+        })
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        fieldset = requested_fieldset(request, serializers.ReviewSerializer._declared_fields, excluded=['product'])
+        reviews = prune_queryset(Review.objects.filter(product=product), serializers.ReviewSerializer(**fieldset))
         filter_set = ReviewFilter(data=request.query_params, queryset=reviews)
         if not filter_set.is_valid():
             raise ValidationError('Bad request, check query parameters')
         paginator = self.pagination_class()
         pf_queryset = paginator.paginate_queryset(filter_set.qs, request)
-        serializer = serializers.ReviewSerializer(pf_queryset, many=True, exclude_fields=['product'])
-        return paginator.get_paginated_response(data={
+        serializer = serializers.ReviewSerializer(pf_queryset, many=True, **fieldset)
+        response = paginator.get_paginated_response(data={
             'product': product.name,
-            'rating': product.get_rating,
+            'rating': product.rating_avg,
             'reviews': serializer.data},
         )
+        response['ETag'] = etag
+        return response
 
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         product = self.get_object(**kwargs)
         data_serializer = self.serializer_class(data=request.data)
         data_serializer.is_valid(raise_exception=True)
-        review, created = Review.objects.update_or_create(
-            user=request.user,
-            product=product,
-            defaults=data_serializer.validated_data
-        )
+        review = Review.objects.unfiltered().select_for_update().get_or_none(user=request.user, product=product)
+        # A soft-deleted review is restored instead of violating unique_together
+        created = review is None or review.is_deleted
+        old_rating = 0 if created else review.rating or 0
+        if review is None:
+            review = Review(user=request.user, product=product)
+        for k, v in data_serializer.validated_data.items():
+            setattr(review, k, v)
+        review.is_deleted = False
+        review.deleted_at = None
+        review.save()
+        product.apply_review_change(rating_delta=(review.rating or 0) - old_rating, count_delta=int(created),
+                                     review=review)
         status_code = 201 if created else 200
         serializer = serializers.ReviewSerializer(instance=review)
         return Response(data=serializer.data, status=status_code)
 
+    @transaction.atomic
     def delete(self, request, *args, **kwargs):
         product = self.get_object(**kwargs)
-        review = product.reviews.get_or_none(user=request.user)
+        review = product.reviews.select_for_update().get_or_none(user=request.user)
         if not review:
             raise ValidationError("You have no review for this product")
         review.hard_delete()
-        return Response(data={'message': 'Successfully deleted'}, status=200)
-
-
+        return Response(data={'message': 'Successfully deleted'}, status=200)
\ No newline at end of file
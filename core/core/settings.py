@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -38,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'drf_spectacular',
     'rest_framework_simplejwt',
@@ -53,6 +57,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.common.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -102,6 +107,46 @@ DATABASES = {
     # }
 }
 
+# Cache
+# Local memory cache lives in one process: invalidations of cached responses, tokens and the
+# category snapshot made by one worker are not seen by the others. It's only for development,
+# outside DEBUG REDIS_URL is required.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if not REDIS_URL and not DEBUG:
+    raise ImproperlyConfigured("Set REDIS_URL, the cache and carts have to be shared by every worker")
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'online-store',
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = 60 * 15
+
+# Carts live outside the database until checkout, see apps/shop/cart.py. The memory store
+# keeps them per process, every worker would see a different cart: only for development
+CART_BACKEND = 'apps.shop.cart.RedisCartStore' if REDIS_URL else 'apps.shop.cart.MemoryCartStore'
+CART_OPTIONS = {'url': REDIS_URL} if REDIS_URL else {}
+
+# Threads resizing uploaded images after the request, 0 renders them in the request itself
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+
+# Node id (0-1023) of this process in order references, unique per process. Without it every
+# process claims one from a counter in Redis, see apps/common/utils.py
+CODE_NODE_ID = os.environ.get('CODE_NODE_ID') or None
+
+# How long authorization data of users with outdated tokens is cached, see apps/accounts/authentication.py
+PRINCIPAL_CACHE_TIMEOUT = 60 * 5
+
+# Blacklisted refresh tokens the per-process filter is sized for before it grows, see apps/accounts/blacklist.py
+TOKEN_BLACKLIST_FILTER_CAPACITY = 100000
+
 AUTH_USER_MODEL = "accounts.User"
 
 # Password validation
@@ -151,8 +196,17 @@ MEDIA_URL = '/media/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ['rest_framework_simplejwt.authentication.JWTAuthentication', ],
+    'DEFAULT_AUTHENTICATION_CLASSES': ['apps.accounts.authentication.ClaimsJWTAuthentication', ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.common.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.common.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5
@@ -176,7 +230,25 @@ INTERNAL_IPS = [
     '127.0.0.1',
 ]
 
+# The default callback shows the toolbar only with DEBUG on and to INTERNAL_IPS
 DEBUG_TOOLBAR_CONFIG = {
-    "SHOW_TOOLBAR_CALLBACK": lambda request: True,
     "UPDATE_ON_FETCH": True,
-}
\ No newline at end of file
+}
+
+# Share of requests getting a Server-Timing header and a log line, see common/timing.py.
+# Off by default outside DEBUG, the header tells anyone how long queries take
+SERVER_TIMING_SAMPLE_RATE = float(os.environ.get('SERVER_TIMING_SAMPLE_RATE', 1 if DEBUG else 0))
+# The log lines are opt-in, with every request sampled they would flood runserver and test output
+SERVER_TIMING_LOG = bool(os.environ.get('SERVER_TIMING_LOG'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'apps.common.timing': {'handlers': ['console'], 'level': 'INFO' if SERVER_TIMING_LOG else 'WARNING',
+                               'propagate': False},
+    },
+}